@@ -1,11 +1,12 @@
 """Functions counting cost of weights in view of their activation/derivative.
 """
 
+import numpy
 from random import randint
 
 from athenet.algorithm.deleting import delete_weights_by_global_fraction
 from athenet.algorithm.derest.network import DerestNetwork
-from athenet.algorithm.derest.utils import change_order
+from athenet.algorithm.derest.utils import change_order, batched
 from athenet.algorithm.numlike.npinterval import NpInterval
 from athenet.algorithm.utils import to_indicators
 
@@ -22,9 +23,19 @@ def length(value):
     return value.upper - value.lower
 
 
+@batched
 def divide_by_max(data):
-    a = data.abs().amax()
-    return data / (a.upper + 1e-6)
+    """
+    Divides every batch of data by its maximal absolute value
+
+    :param Numlike data: data with number of batches as the first dimension
+    :return Numlike:
+    """
+    axes = tuple(xrange(1, len(data.shape)))
+    # same as data.abs().amax(...).upper without the abs intermediate
+    a = numpy.maximum(data.upper.max(axis=axes, keepdims=True),
+                      -data.lower.min(axis=axes, keepdims=True))
+    return data / (a + 1e-6)
 
 
 def get_derest_indicators(network, input_=None, count_function=length,
@@ -35,7 +46,8 @@ def get_derest_indicators(network, input_=None, count_function=length,
     Returns indicators of importance using derest algorithm
 
     :param Network network: network to work with
-    :param input_: possible input for network
+    :param input_: possible input for network, NpInterval is cast to
+                   NpInterval.DTYPE
     :type input_: Numlike or None
     :param function count_function: function to use
     :param batch_size: size of batch in computing derivatives
@@ -43,14 +55,19 @@ def get_derest_indicators(network, input_=None, count_function=length,
     :param function normalize_activations: function to normalize activations
         between layers
     :param function normalize_derivatives: function to normalize derivatives
-        between layers
+        between layers, applied to every batch separately, functions marked
+        with batched from athenet.algorithm.derest.utils take the whole
+        batch of derivatives with number of batches as the first dimension
     :return array of numpy.ndarrays:
     """
     if input_ is None:
         input_ = NpInterval.from_shape(
             change_order(network.layers[0].input_shape),
-            neutral=False
+            neutral=False, read_only=True
         )
+    elif isinstance(input_, NpInterval):
+        # mixed dtypes would promote every layer to float64
+        input_ = input_.astype(NpInterval.DTYPE, copy=False)
 
     random_id = randint(0, 10**6)
     network_folder = TMP_DIR + str(random_id)
@@ -63,7 +80,7 @@ def get_derest_indicators(network, input_=None, count_function=length,
         max_batch_size = output_nr
     output = input_.derest_output(output_nr)
     for i in xrange(0, output_nr, max_batch_size):
-        print "BATCH:", i
+        print("BATCH: %d" % i)
         derest_network.count_derivatives(output[i:(i+max_batch_size)])
 
     results = derest_network.count_derest(count_function)
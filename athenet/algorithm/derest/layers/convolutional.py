@@ -10,10 +10,13 @@ from athenet.algorithm.numlike import assert_numlike
 class DerestConvolutionalLayer(DerestLayer):
     need_activation = True
     need_derivatives = True
+    has_weights = True
 
     def __init__(self, *args):
         super(DerestConvolutionalLayer, self).__init__(*args)
         self.theano_ops = {}
+        self.filter_shape = change_order(self.layer.filter_shape)
+        self.biases = theano.shared(self.layer.b)
 
     def _count_activation(self, layer_input):
         """
@@ -23,10 +26,10 @@ class DerestConvolutionalLayer(DerestLayer):
         :return Numlike:
         """
         return a_conv(
-            layer_input, change_order(self.layer.input_shape),
-            self.layer.W, change_order(self.layer.filter_shape),
-            theano.shared(self.layer.b), self.layer.stride, self.layer.padding,
-            self.layer.n_groups
+            layer_input, self.input_shape,
+            self.layer.W, self.filter_shape,
+            self.biases, self.layer.stride, self.layer.padding,
+            self.layer.n_groups, self.theano_ops
         )
 
     def _count_derivatives(self, layer_output, input_shape):
@@ -41,7 +44,7 @@ class DerestConvolutionalLayer(DerestLayer):
         """
         return d_conv(
             layer_output, input_shape,
-            change_order(self.layer.filter_shape), self.layer.W,
+            self.filter_shape, self.layer.W,
             self.layer.stride, self.layer.padding, self.layer.n_groups,
             self.theano_ops
         )
@@ -66,19 +69,45 @@ class DerestConvolutionalLayer(DerestLayer):
 
         return activation[:, i2:l2:s2, i3:l3:s3]
 
-    def _count_derest_for_weight(self, act, der, W, j0, j1):
-        act = self._get_activation_for_weight(act, j0, j1)
+    def _get_activation_patches(self, activation):
+        """
+        For every weight of a filter returns activations for inputs used by
+        this weight.
+
+        :param Numlike activation: activation with padded edges
+        :return Numlike: activations in format (number of input channels,
+            filter height * filter width, output height, output width)
+        """
+        fh, fw, _ = self.layer.filter_shape
+        try:
+            return activation.patches((fh, fw), self.layer.stride)
+        except NotImplementedError:
+            return activation.stack(
+                [self._get_activation_for_weight(activation, j2, j3)
+                 for j2, j3 in product(xrange(fh), xrange(fw))],
+                axis=1
+            )
+
+    def _count_derest_for_weights(self, act, der, W):
+        """
+        Returns impact of every weight of a group on output of network.
 
-        a1, a2, a3 = act.shape
+        :param Numlike act: activations of the group with padded edges
+        :param Numlike der: derivatives of the group
+        :param numpy.ndarray W: weights of the group
+        :return Numlike: impacts in the same format as weights
+        """
+        patches = self._get_activation_patches(act)
+
+        p1, p2, p3, p4 = patches.shape
         d1, d2, d3 = der.shape
-        final_shape = (d1, a1, a2, a3)
 
-        act = act.reshape((1, a1, a2, a3)).broadcast(final_shape)
-        der = der.reshape((d1, 1, d2, d3)).broadcast(final_shape)
+        patches = patches.reshape((p1 * p2, p3 * p4))
+        der = der.reshape((d1, d2 * d3))
 
-        inf = (der * act).sum((2, 3))
-        inf = inf.reshape((W.shape[0], W.shape[1]))
-        return inf * W[:, :, j0, j1]
+        inf = der.dot(patches.T)
+        inf = inf.reshape(W.shape)
+        return inf * W
 
     def count_derest(self, count_function):
         """
@@ -88,12 +117,12 @@ class DerestConvolutionalLayer(DerestLayer):
             takes Numlike and returns float
         :return list of numpy arrays:
         """
-        indicators = numpy.zeros_like(self.layer.W)
+        indicators = numpy.empty_like(self.layer.W)
         W = self.layer.W
 
         derivatives = self.load_derivatives()
 
-        input_shape = (1, ) + change_order(self.layer.input_shape)
+        input_shape = (1, ) + self.input_shape
         activation = self.load_activations().reshape(input_shape)
         activation = activation.\
             reshape_for_padding(input_shape, self.layer.padding)
@@ -113,16 +142,16 @@ class DerestConvolutionalLayer(DerestLayer):
             w_first = n_group * w_group_size
             weights = W[w_first:(w_first + w_group_size), :, :, :]
 
+            inf = self._count_derest_for_weights(act, der, weights)
             for j2, j3 in product(xrange(W.shape[2]), xrange(W.shape[3])):
-                ind = count_function(self._count_derest_for_weight(
-                    act, der, weights, j2, j3))
+                ind = count_function(inf[:, :, j2, j3])
                 indicators[w_first:(w_first + w_group_size), :, j2, j3] = ind
 
         return [indicators]
 
 
 def a_conv(layer_input, image_shape, weights, filter_shape, biases,
-           stride=(1, 1), padding=(0, 0), n_groups=1):
+           stride=(1, 1), padding=(0, 0), n_groups=1, theano_ops=None):
     """Returns estimated activation of convolutional layer.
 
     :param layer_input: input Numlike in input_shp format
@@ -152,12 +181,14 @@ def a_conv(layer_input, image_shape, weights, filter_shape, biases,
     :type stride: pair of integers
     :type padding: pair of integers
     :type n_groups: integer
+    :param theano_ops: map in which theano graph might be saved
+    :type theano_ops: map of theano functions
     :rtype: Numlike
     """
     assert_numlike(layer_input)
     try:
         return layer_input.op_conv(weights, image_shape, filter_shape, biases,
-                                   stride, padding, n_groups)
+                                   stride, padding, n_groups, theano_ops)
     except NotImplementedError:
         # n_in, h, w - number of input channels, image height, image width
         n_in, h, w = image_shape
@@ -8,6 +8,7 @@ from athenet.algorithm.numlike import assert_numlike
 class DerestFullyConnectedLayer(DerestLayer):
     need_activation = True
     need_derivatives = True
+    has_weights = True
 
     def _count_activation(self, layer_input):
         """
@@ -44,7 +45,7 @@ class DerestFullyConnectedLayer(DerestLayer):
         activations = self.load_activations().reshape((input_shape, 1))
         derivatives = self.load_derivatives().reshape((1, output_shape))
 
-        ind = ((activations * derivatives) * self.layer.W)
+        ind = activations.dot(derivatives) * self.layer.W
         return [count_function(ind)]
 
 
@@ -1,9 +1,10 @@
+from multiprocessing.pool import ThreadPool
+
 from athenet.algorithm.derest.layers import DerestSoftmaxLayer,\
     DerestReluLayer, DerestPoolLayer, DerestNormLayer, DerestLayer, \
     DerestFullyConnectedLayer, DerestConvolutionalLayer, DerestDropoutLayer
 from athenet.layers import Softmax, ReLU, PoolingLayer, LRN, \
     ConvolutionalLayer, Dropout, FullyConnectedLayer, InceptionLayer
-from athenet.algorithm.derest.utils import add_tuples, change_order
 
 
 def get_derest_layer(layer, *args):
@@ -14,26 +15,14 @@ def get_derest_layer(layer, *args):
     :param Layer layer: network's original layer
     :return DerestLayer: new better derest layer
     """
-    if isinstance(layer, Softmax):
-        return DerestSoftmaxLayer(layer, *args)
-    if isinstance(layer, ReLU):
-        return DerestReluLayer(layer, *args)
-    if isinstance(layer, PoolingLayer):
-        return DerestPoolLayer(layer, *args)
-    if isinstance(layer, LRN):
-        return DerestNormLayer(layer, *args)
-    if isinstance(layer, ConvolutionalLayer):
-        return DerestConvolutionalLayer(layer, *args)
-    if isinstance(layer, Dropout):
-        return DerestDropoutLayer(layer, *args)
-    if isinstance(layer, FullyConnectedLayer):
-        return DerestFullyConnectedLayer(layer, *args)
-    if isinstance(layer, InceptionLayer):
-        return DerestInceptionLayer(layer, *args)
+    for layer_class in type(layer).__mro__:
+        if layer_class in _DEREST_LAYERS:
+            return _DEREST_LAYERS[layer_class](layer, *args)
     raise NotImplementedError
 
 
 class DerestInceptionLayer(DerestLayer):
+    has_weights = True
 
     def __init__(self, layer, layer_folder, *args):
         super(DerestInceptionLayer, self).__init__(layer, layer_folder, *args)
@@ -46,47 +35,61 @@ class DerestInceptionLayer(DerestLayer):
                 derest_layer_list.append(get_derest_layer(l, folder, *args))
             self.derest_layer_lists.append(derest_layer_list)
 
+        self.channel_slices = []
+        last = 0
+        for layer in self.layer.top_layers:
+            channels = layer.output_shape[2]
+            self.channel_slices.append(slice(last, last + channels))
+            last += channels
+
     def _count_activation(self, input):
-        results = None
+        results = []
 
         for derest_layer_list in self.derest_layer_lists:
             inp = input
             for derest_layer in derest_layer_list:
                 inp = derest_layer.count_activation(inp)
+            results.append(inp)
 
-            if results is None:
-                results = inp
-            else:
-                results = results.concat(inp)
-
-        return results
+        return input.concatenate(results)
 
     def _count_derivatives(self, output, input_shape):
-        output_list = []
-        last = 0
-        for layer in self.layer.top_layers:
-            channels = layer.output_shape[2]
-            output_list.append(output[:, last:(last + channels), ::])
-            last += channels
+        output_list = [output[:, channels, ::]
+                       for channels in self.channel_slices]
 
         batches = input_shape[0]
-        result = None
-        for output, derest_list in zip(output_list, self.derest_layer_lists):
-            out = output
-
+        results = []
+        for out, derest_list in zip(output_list, self.derest_layer_lists):
             for derest_layer in reversed(derest_list):
                 out = derest_layer.count_derivatives(out, batches)
+            results.append(out)
 
-            if result is None:
-                result = out
-            else:
-                result += out
-
-        return result
+        return output.stack(results).sum((0, ))
 
     def count_derest(self, f):
-        results = []
-        for derest_layer_list in self.derest_layer_lists:
+        def count_branch(derest_layer_list):
+            results = []
             for derest_layer in derest_layer_list:
                 results.extend(derest_layer.count_derest(f))
-        return results
+            return results
+
+        # branches are independent, numpy releases the GIL in heavy operations
+        pool = ThreadPool(len(self.derest_layer_lists))
+        try:
+            branch_results = pool.map(count_branch, self.derest_layer_lists)
+        finally:
+            pool.close()
+            pool.join()
+        return [result for results in branch_results for result in results]
+
+
+_DEREST_LAYERS = {
+    Softmax: DerestSoftmaxLayer,
+    ReLU: DerestReluLayer,
+    PoolingLayer: DerestPoolLayer,
+    LRN: DerestNormLayer,
+    ConvolutionalLayer: DerestConvolutionalLayer,
+    Dropout: DerestDropoutLayer,
+    FullyConnectedLayer: DerestFullyConnectedLayer,
+    InceptionLayer: DerestInceptionLayer,
+}
@@ -1,34 +1,36 @@
 import pickle
 import os
 
-from athenet.algorithm.derest.utils import change_order, add_tuples,\
-    make_iterable
+from athenet.algorithm.derest.utils import change_order, make_iterable, \
+    batched, for_each_batch
 
 
 class DerestLayer(object):
     need_activation = False
     need_derivatives = False
+    has_weights = False
 
     def __init__(self, layer, layer_folder, normalize_activation=lambda x: x,
-                 normalize_derivatives=lambda x: x):
+                 normalize_derivatives=batched(lambda x: x)):
         self.layer = layer
+        self.input_shape = change_order(make_iterable(layer.input_shape))
+        self.output_shape = change_order(make_iterable(layer.output_shape))
 
         self.layer_folder = layer_folder + "_" + layer.name
         if not os.path.exists(self.layer_folder):
             os.makedirs(self.layer_folder)
 
         self.normalize_activation = normalize_activation
-        self._normalize_derivatives = normalize_derivatives
-
-    def normalize_derivatives(self, data):
-        return data.stack([self._normalize_derivatives(d) for d in data])
+        # derivatives are normalized for every batch separately, unless
+        # function is marked as working on the whole batch
+        self.normalize_derivatives = for_each_batch(normalize_derivatives)
 
     def _count_activation(self, layer_input):
         raise NotImplementedError
 
     def _save_to_file(self, filename, data):
         with open(self.layer_folder + "/" + filename, 'wb') as f:
-            pickle.dump(data, f)
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
 
     def _load_from_file(self, filename):
         try:
@@ -58,8 +60,7 @@ class DerestLayer(object):
         :return Numlike: activations
         """
         layer_input = self.normalize_activation(layer_input)
-        input_shape = change_order(make_iterable(self.layer.input_shape))
-        layer_input = layer_input.reshape(input_shape)
+        layer_input = layer_input.reshape(self.input_shape)
         if self.need_activation:
             self.save_activations(layer_input)
         return self._count_activation(layer_input)
@@ -77,11 +78,8 @@ class DerestLayer(object):
         :return Numlike: derivatives
         """
         layer_output = self.normalize_derivatives(layer_output)
-        input_shape = add_tuples(batches,
-                                 change_order(self.layer.input_shape))
-        output_shape = add_tuples(batches,
-                                  change_order(self.layer.output_shape))
-        layer_output = layer_output.reshape(output_shape)
+        input_shape = (batches, ) + self.input_shape
+        layer_output = layer_output.reshape((batches, ) + self.output_shape)
 
         if self.need_derivatives:
             derivatives = self.load_derivatives()
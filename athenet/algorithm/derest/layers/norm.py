@@ -1,6 +1,5 @@
 from athenet.algorithm.derest.layers import DerestLayer
 from athenet.algorithm.numlike import assert_numlike
-from athenet.algorithm.derest.utils import change_order
 
 
 class DerestNormLayer(DerestLayer):
@@ -13,7 +12,7 @@ class DerestNormLayer(DerestLayer):
         :param Numlike layer_input:
         :return Numlike:
         """
-        return a_norm(layer_input, change_order(self.layer.input_shape),
+        return a_norm(layer_input, self.input_shape,
                       self.layer.local_range, self.layer.k,
                       self.layer.alpha, self.layer.beta)
 
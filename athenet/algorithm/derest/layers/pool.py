@@ -1,6 +1,5 @@
 from athenet.algorithm.derest.layers import DerestLayer
 from athenet.algorithm.numlike import assert_numlike
-from athenet.algorithm.derest.utils import change_order
 
 
 class DerestPoolLayer(DerestLayer):
@@ -13,7 +12,7 @@ class DerestPoolLayer(DerestLayer):
         :param Numlike layer_input:
         :return Numlike:
         """
-        return a_pool(layer_input, change_order(self.layer.input_shape),
+        return a_pool(layer_input, self.input_shape,
                       self.layer.poolsize, self.layer.stride,
                       self.layer.padding, self.layer.mode)
 
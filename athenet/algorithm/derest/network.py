@@ -17,6 +17,8 @@ class DerestNetwork(object):
         self.layers = [get_derest_layer(layer, folder + "/" + str(i), *args)
                        for i, layer
                        in zip(xrange(len(network.layers)), network.layers)]
+        self.weighted_layers = [layer for layer in self.layers
+                                if layer.has_weights]
 
     def count_activations(self, inp):
         """
@@ -51,9 +53,8 @@ class DerestNetwork(object):
             takes Numlike and returns float
         :return list of numpy arrays:
         """
-        ""
         result = []
-        for layer in self.layers:
+        for layer in self.weighted_layers:
             indicators = layer.count_derest(count_function)
             result.extend(indicators)
         return result
@@ -32,3 +32,33 @@ def add_tuples(a, b):
     if not isinstance(b, tuple):
         b = (b, )
     return a + b
+
+
+def batched(function):
+    """
+    Marks function as working on the whole batch of data at once, with
+    number of batches as the first dimension, so that it is not applied
+    to every batch separately
+
+    :param function function: function to be marked
+    :return function: the same function
+    """
+    function.batched = True
+    return function
+
+
+def for_each_batch(function):
+    """
+    Turns function working on a single batch into function working on every
+    batch of data separately, functions marked with batched are returned
+    unchanged
+
+    :param function function: function to be applied to every batch
+    :return function:
+    """
+    if getattr(function, 'batched', False):
+        return function
+
+    def apply(data):
+        return data.stack([function(d) for d in data])
+    return batched(apply)
@@ -3,11 +3,16 @@ sparsifying.
 
 This module contains NpInterval class and auxiliary objects.
 """
-from theano import function, config
+from theano import function, config, shared
 from theano import tensor as T
 
-from itertools import product
+from itertools import chain, product
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+from threading import Lock
+import atexit
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 import math
 
 from athenet.algorithm.numlike import Interval
@@ -15,6 +20,10 @@ from athenet.algorithm.numlike import Interval
 
 class NpInterval(Interval):
 
+    # dtype of bounds allocated by NpInterval itself, float32 halves memory
+    # traffic of interval arithmetic where its precision is enough
+    DTYPE = config.floatX
+
     def __init__(self, lower, upper, accuracy=1e-6):
         """Creates NpInterval.
 
@@ -23,13 +32,52 @@ class NpInterval(Interval):
         :param float accuracy: acceptable error in check lower <= upper
 
         """
-        assert (lower - accuracy <= upper).all()
+        if lower.size and not any(lower.strides) and not any(upper.strides):
+            # bounds broadcast from single values, e.g. by from_shape
+            assert lower.flat[0] - accuracy <= upper.flat[0]
+        else:
+            assert (lower - accuracy <= upper).all()
         super(NpInterval, self).__init__(lower, upper)
 
     @staticmethod
     def construct(lower, upper):
         return NpInterval(lower, upper)
 
+    @staticmethod
+    def _from_bounds(bounds):
+        """Returns NpInterval with bounds being views of one array.
+
+        :param numpy.ndarray bounds: array of shape (2, ...) with lower bound
+                                     at index 0 and upper bound at index 1
+        :rtype: NpInterval
+        """
+        return NpInterval(bounds[0], bounds[1])
+
+    @staticmethod
+    def _from_valid(lower, upper):
+        """Returns NpInterval with given bounds without checking that
+        lower <= upper.
+
+        :param lower: lower bound taken from a valid NpInterval
+        :param upper: upper bound taken from a valid NpInterval
+        :rtype: NpInterval
+        """
+        result = NpInterval.__new__(NpInterval)
+        Interval.__init__(result, lower, upper)
+        return result
+
+    def __getitem__(self, at):
+        """Returns specified slice of NpInterval as a NpInterval.
+
+        :param at: coordinates / slice to be taken, a tuple takes all of
+                   them at once
+        :rtype: NpInterval
+
+        .. note:: Does not copy data. Slice of valid bounds is valid, so
+                  bounds are not checked again.
+        """
+        return NpInterval._from_valid(self.lower[at], self.upper[at])
+
     def __setitem__(self, at, other):
         """Just like numpy __setitem__ function, but as a operator.
         :at: Coordinates / slice to be set.
@@ -38,6 +86,102 @@ class NpInterval(Interval):
         self.lower[at] = other.lower
         self.upper[at] = other.upper
 
+    def _can_update_with(self, other_lower, other_upper):
+        """Returns whether bounds of self can be overwritten in place with
+        results of elementwise operation with given bounds.
+
+        :param other_lower: lower bound of other operand
+        :param other_upper: upper bound of other operand
+        :rtype: bool
+        """
+        lower, upper = self.lower, self.upper
+        if not (isinstance(lower, np.ndarray) and
+                isinstance(upper, np.ndarray)):
+            return False
+        if not (lower.flags.writeable and upper.flags.writeable):
+            return False
+        shape = np.broadcast(lower, upper, other_lower, other_upper).shape
+        if lower.shape != shape or upper.shape != shape:
+            return False
+        dtype = np.result_type(lower, upper, other_lower, other_upper)
+        if not np.can_cast(dtype, lower.dtype, 'same_kind') or \
+                not np.can_cast(dtype, upper.dtype, 'same_kind'):
+            return False
+        # bound written first must not be read afterwards
+        return not (np.may_share_memory(lower, upper) or
+                    np.may_share_memory(lower, other_lower) or
+                    np.may_share_memory(lower, other_upper))
+
+    def __add__(self, other):
+        """Returns sum of NpInterval and other.
+
+        :param other: value to be added
+        :type other: Interval or numpy.ndarray or float
+        :rtype: NpInterval
+        """
+        if isinstance(other, Interval):
+            other_lower, other_upper = other.lower, other.upper
+        else:
+            other_lower = other_upper = other
+        operands = (self.lower, self.upper, other_lower, other_upper)
+        bounds = _empty_bounds(np.broadcast(*operands).shape, operands)
+        np.add(self.lower, other_lower, out=bounds[0, ...])
+        np.add(self.upper, other_upper, out=bounds[1, ...])
+        return NpInterval._from_bounds(bounds)
+
+    def __sub__(self, other):
+        """Returns difference of NpInterval and other.
+
+        :param other: value to be subtracted
+        :type other: Interval or numpy.ndarray or float
+        :rtype: NpInterval
+        """
+        if isinstance(other, Interval):
+            other_lower, other_upper = other.upper, other.lower
+        else:
+            other_lower = other_upper = other
+        operands = (self.lower, self.upper, other_lower, other_upper)
+        bounds = _empty_bounds(np.broadcast(*operands).shape, operands)
+        np.subtract(self.lower, other_lower, out=bounds[0, ...])
+        np.subtract(self.upper, other_upper, out=bounds[1, ...])
+        return NpInterval._from_bounds(bounds)
+
+    def __iadd__(self, other):
+        """Adds other to NpInterval in place if its bounds can be
+        overwritten, otherwise returns their sum.
+
+        :param other: value to be added
+        :type other: Interval or numpy.ndarray or float
+        :rtype: NpInterval
+        """
+        if isinstance(other, Interval):
+            other_lower, other_upper = other.lower, other.upper
+        else:
+            other_lower = other_upper = other
+        if not self._can_update_with(other_lower, other_upper):
+            return self + other
+        np.add(self.lower, other_lower, out=self.lower)
+        np.add(self.upper, other_upper, out=self.upper)
+        return self
+
+    def __isub__(self, other):
+        """Subtracts other from NpInterval in place if its bounds can be
+        overwritten, otherwise returns their difference.
+
+        :param other: value to be subtracted
+        :type other: Interval or numpy.ndarray or float
+        :rtype: NpInterval
+        """
+        if isinstance(other, Interval):
+            other_lower, other_upper = other.upper, other.lower
+        else:
+            other_lower = other_upper = other
+        if not self._can_update_with(other_lower, other_upper):
+            return self - other
+        np.subtract(self.lower, other_lower, out=self.lower)
+        np.subtract(self.upper, other_upper, out=self.upper)
+        return self
+
     def _antiadd(self, other):
         """For given NpInterval returns NpInterval which shuold be added
         to id to get NpInterval equal to self.
@@ -56,18 +200,18 @@ class NpInterval(Interval):
         :rtype: NpInterval
         """
         if isinstance(other, NpInterval):
-            ll = self.lower * other.lower
-            lu = self.lower * other.upper
-            ul = self.upper * other.lower
-            uu = self.upper * other.upper
-            lower = np.minimum(np.minimum(ll, lu), np.minimum(ul, uu))
-            upper = np.maximum(np.maximum(ll, lu), np.maximum(ul, uu))
-        else:
-            ll = self.lower * other
-            uu = self.upper * other
-            lower = np.minimum(ll, uu)
-            upper = np.maximum(ll, uu)
-        return NpInterval(lower, upper)
+            if (self.lower >= 0.0).all() and (other.lower >= 0.0).all():
+                # products of bounds are ordered like the bounds
+                operands = (self.lower, self.upper, other.lower, other.upper)
+                bounds = _empty_bounds(np.broadcast(*operands).shape,
+                                       operands)
+                np.multiply(self.lower, other.lower, out=bounds[0, ...])
+                np.multiply(self.upper, other.upper, out=bounds[1, ...])
+                return NpInterval._from_bounds(bounds)
+            return NpInterval._from_bounds(_product_bounds(
+                (self.lower, self.upper), (other.lower, other.upper)))
+        return NpInterval._from_bounds(
+            _scaled_bounds((self.lower, self.upper), other, np.multiply))
 
     def __div__(self, other):
         """Returns quotient of self and other.
@@ -79,42 +223,47 @@ class NpInterval(Interval):
         .. warning:: Divisor should not contain zero.
         """
         if isinstance(other, NpInterval):
-            ll = self.lower / other.lower
-            lu = self.lower / other.upper
-            ul = self.upper / other.lower
-            uu = self.upper / other.upper
-            lower = np.minimum(np.minimum(ll, lu), np.minimum(ul, uu))
-            upper = np.maximum(np.maximum(ll, lu), np.maximum(ul, uu))
-            return NpInterval(lower, upper)
-        else:
-            lower = self.lower / other
-            upper = self.upper / other
-            return NpInterval(np.minimum(lower, upper),
-                              np.maximum(lower, upper))
+            return NpInterval._from_bounds(_product_bounds(
+                (self.lower, self.upper), (other.lower, other.upper),
+                ufunc=np.divide))
+        return NpInterval._from_bounds(
+            _scaled_bounds((self.lower, self.upper), other, np.divide))
 
     def reciprocal(self):
         """Returns reciprocal (1/x) of the NpInterval.
 
         :rtype: NpInterval
+
+        .. warning:: NpInterval should not contain zero.
         """
-        upper_reciprocal = np.reciprocal(self.upper)
-        lower_reciprocal = np.reciprocal(self.lower)
-        return NpInterval(np.minimum(upper_reciprocal, lower_reciprocal),
-                          np.maximum(upper_reciprocal, lower_reciprocal))
+        # 1/x is decreasing on each side of zero, so bounds just swap
+        shape = np.broadcast(self.lower, self.upper).shape
+        bounds = _empty_bounds(shape, (self.lower, self.upper))
+        np.reciprocal(self.upper, out=bounds[0, ...])
+        np.reciprocal(self.lower, out=bounds[1, ...])
+        return NpInterval._from_bounds(bounds)
 
     def neg(self):
         """Returns (-1) * NpInterval
 
         :rtype: NpInterval
         """
-        return NpInterval(np.negative(self.upper), np.negative(self.lower))
+        shape = np.broadcast(self.lower, self.upper).shape
+        bounds = _empty_bounds(shape, (self.lower, self.upper))
+        np.negative(self.upper, out=bounds[0, ...])
+        np.negative(self.lower, out=bounds[1, ...])
+        return NpInterval._from_bounds(bounds)
 
     def exp(self):
         """Returns NpInterval representing the exponential of the NpInterval.
 
         :rtype: NpInterval
         """
-        return NpInterval(np.exp(self.lower), np.exp(self.upper))
+        shape = np.broadcast(self.lower, self.upper).shape
+        bounds = _empty_bounds(shape, (self.lower, self.upper, 0.0))
+        np.exp(self.lower, out=bounds[0, ...])
+        np.exp(self.upper, out=bounds[1, ...])
+        return NpInterval._from_bounds(bounds)
 
     def _has_zero(self):
         """For any interval in NpInterval, returns whether is contains zero.
@@ -128,11 +277,20 @@ class NpInterval(Interval):
 
         :rtype: NpInterval
         """
-        uu = self.upper * self.upper
-        ll = self.lower * self.lower
-        lower = np.select([self._has_zero(), True], [0, np.minimum(ll, uu)])
-        upper = np.maximum(ll, uu)
-        return NpInterval(lower, upper)
+        shape = np.broadcast(self.lower, self.upper).shape
+        bounds = _empty_bounds(shape, (self.lower, self.upper))
+        lower, upper = bounds[0, ...], bounds[1, ...]
+        # bounds are squares of extreme absolute values, computed in place
+        abs_lower = np.abs(self.lower, out=np.empty_like(lower))
+        np.abs(self.upper, out=upper)
+        np.minimum(abs_lower, upper, out=lower)
+        np.maximum(abs_lower, upper, out=upper)
+        # interval contains zero iff product of its bounds is not positive
+        has_zero = np.multiply(self.lower, self.upper, out=abs_lower) <= 0
+        np.copyto(lower, 0, where=has_zero)
+        np.square(lower, out=lower)
+        np.square(upper, out=upper)
+        return NpInterval._from_bounds(bounds)
 
     def power(self, exponent):
         """Returns NpInterval^exponent.
@@ -140,13 +298,16 @@ class NpInterval(Interval):
         :param float exponent: Number to be passed as exponent to N^exponent.
         :rtype: NpInterval
         """
+        if exponent == 2:
+            # multiplication is much cheaper than generic np.power
+            return self.square()
         le = np.power(self.lower, exponent)
         ue = np.power(self.upper, exponent)
         if isinstance(exponent, (int, long)):
             if exponent > 0:
                 if exponent % 2 == 0:
-                    l = np.select([self._has_zero(), True],
-                                  [0, np.minimum(le, ue)])
+                    l = np.where(self.lower * self.upper > 0,
+                                 np.minimum(le, ue), 0.)
                     u = np.maximum(le, ue)
                 else:
                     l = le
@@ -172,9 +333,44 @@ class NpInterval(Interval):
     def dot(self, other):
         """Dot product of NpInterval and a other.
 
-        :param numpy.ndarray other: second dot param
+        :param other: second dot param, NpInterval must be 2D
+        :type other: numpy.ndarray or NpInterval
         :rtype: NpInterval
+
+        .. note:: Pass numpy.ndarray other in dtype of the NpInterval,
+                  otherwise numpy casts a copy of it for every product.
         """
+        if isinstance(other, NpInterval):
+            if (other.lower >= 0.0).all():
+                return self._dot_non_negative(other)
+            if (self.lower >= 0.0).all():
+                return other.T._dot_non_negative(self.T).T
+            m, k = self.shape
+            n = other.shape[1]
+            # the (m, k, n) product of intervals is summed in chunks along k,
+            # so that its temporaries stay about 2 ** 22 items, the whole
+            # product would take gigabytes for the first convolution
+            step = max(1, (1 << 22) // max(m * n, 1))
+            result = None
+            for at in xrange(0, max(k, 1), step):
+                a = self[:, at:(at + step)]
+                b = other[at:(at + step), :]
+                part = (a.reshape((m, a.shape[1], 1)) *
+                        b.reshape((1, b.shape[0], n))).sum(1)
+                if result is None:
+                    result = part
+                else:
+                    result.lower += part.lower
+                    result.upper += part.upper
+            return result
+        other = np.ascontiguousarray(other)
+        # weights of a single sign need only two matrix products
+        if (other >= 0.0).all():
+            return NpInterval(np.dot(self.lower, other),
+                              np.dot(self.upper, other))
+        if (other <= 0.0).all():
+            return NpInterval(np.dot(self.upper, other),
+                              np.dot(self.lower, other))
         other_negative = np.minimum(other, 0.0)
         other_positive = np.maximum(other, 0.0)
         lower_pos_dot = np.dot(self.lower, other_positive)
@@ -184,6 +380,23 @@ class NpInterval(Interval):
         return NpInterval(lower_pos_dot + upper_neg_dot,
                           upper_pos_dot + lower_neg_dot)
 
+    def _dot_non_negative(self, other):
+        """Dot product of NpInterval and NpInterval with non-negative lower
+        bound.
+
+        :param NpInterval other: second dot param, other.lower >= 0
+        :rtype: NpInterval
+        """
+        lower_negative = np.minimum(self.lower, 0.0)
+        lower_positive = np.maximum(self.lower, 0.0)
+        upper_negative = np.minimum(self.upper, 0.0)
+        upper_positive = np.maximum(self.upper, 0.0)
+        lower = np.dot(lower_positive, other.lower) + \
+            np.dot(lower_negative, other.upper)
+        upper = np.dot(upper_positive, other.upper) + \
+            np.dot(upper_negative, other.lower)
+        return NpInterval(lower, upper)
+
     def max(self, other):
         """Returns interval such that for any numbers (x, y) in a pair of
         corresponding intervals in (self, other) arrays, max(x, y) is in result
@@ -205,13 +418,20 @@ class NpInterval(Interval):
 
         :rtype: NpInterval
         """
-        lower = np.select([self.lower > 0.0, self.upper < 0.0, True],
-                          [self.lower, -self.upper, 0.0])
-        upper = np.maximum(-self.lower, self.upper)
-        return NpInterval(lower, upper)
+        shape = np.broadcast(self.lower, self.upper).shape
+        bounds = _empty_bounds(shape, (self.lower, self.upper))
+        lower, upper = bounds[0, ...], bounds[1, ...]
+        # max(lower, -upper) is positive only if interval does not contain 0
+        np.negative(self.upper, out=lower)
+        np.maximum(lower, self.lower, out=lower)
+        np.maximum(lower, 0, out=lower)
+        np.negative(self.lower, out=upper)
+        np.maximum(upper, self.upper, out=upper)
+        return NpInterval._from_bounds(bounds)
 
     @classmethod
-    def from_shape(cls, shp, neutral=True, lower_val=None, upper_val=None):
+    def from_shape(cls, shp, neutral=True, lower_val=None, upper_val=None,
+                   read_only=False):
         """Returns NpInterval of shape shp with given lower and upper values.
 
         :param shp: shape of created NpInterval
@@ -222,6 +442,8 @@ class NpInterval(Interval):
                                 not set by passing arguments.
         :param float lower_val: value of lower bound
         :param float upper_val: value of upper bound
+        :param bool read_only: if True bounds are read-only views of a single
+                               value instead of arrays filled with it
         """
         if lower_val is None:
             lower_val = cls.NEUTRAL_LOWER if neutral else cls.DEFAULT_LOWER
@@ -230,9 +452,16 @@ class NpInterval(Interval):
         if lower_val > upper_val:
             if lower_val != np.inf or upper_val != -np.inf:
                 raise ValueError("lower_val > upper_val")
-        lower = np.full(shp, lower_val, dtype=config.floatX)
-        upper = np.full(shp, upper_val, dtype=config.floatX)
-        return NpInterval(lower, upper)
+        if read_only:
+            lower = np.broadcast_to(np.asarray(lower_val, cls.DTYPE), shp)
+            upper = np.broadcast_to(np.asarray(upper_val, cls.DTYPE), shp)
+            return NpInterval(lower, upper)
+        if isinstance(shp, (int, long, np.integer)):
+            shp = (shp, )
+        bounds = np.empty((2, ) + tuple(shp), dtype=cls.DTYPE)
+        bounds[0] = lower_val
+        bounds[1] = upper_val
+        return cls._from_bounds(bounds)
 
     def broadcast(self, shape):
         """Broadcast interval
@@ -243,6 +472,53 @@ class NpInterval(Interval):
         return NpInterval(np.broadcast_to(self.lower, shape),
                           np.broadcast_to(self.upper, shape))
 
+    def astype(self, dtype, copy=True):
+        """Returns NpInterval with bounds cast to given dtype.
+
+        :param dtype: dtype of bounds of result
+        :param bool copy: if False and bounds already have given dtype, self
+                          is returned instead of a copy
+        :rtype: NpInterval
+
+        .. note:: Bounds are copied into one contiguous buffer. Rounding is
+                  monotonic, so bounds stay ordered and are not checked
+                  again.
+        """
+        dtype = np.dtype(dtype)
+        if not copy and self.lower.dtype == dtype and \
+                self.upper.dtype == dtype:
+            return self
+        bounds = np.empty((2, ) + self.shape, dtype=dtype)
+        bounds[0, ...] = self.lower
+        bounds[1, ...] = self.upper
+        return NpInterval._from_valid(bounds[0, ...], bounds[1, ...])
+
+    def patches(self, patch_shape, stride=(1, 1)):
+        """Returns every patch of NpInterval that a filter is applied to.
+
+        :param patch_shape: patch shape in format (height, width)
+        :type patch_shape: pair of integers
+        :param stride: pair representing interval at which patches are taken
+        :type stride: pair of integers
+        :returns: patches in format (number of channels,
+                  patch height * patch width, output height, output width)
+        :rtype: NpInterval
+        """
+        n_channels, h, w = self.shape
+        ph, pw = patch_shape
+        sh, sw = stride
+        shape = (n_channels, ph, pw, (h - ph) / sh + 1, (w - pw) / sw + 1)
+        result_shape = (n_channels, ph * pw) + shape[3:]
+
+        def get_patches(a):
+            c_stride, h_stride, w_stride = a.strides
+            strides = (c_stride, h_stride, w_stride, h_stride * sh,
+                       w_stride * sw)
+            view = as_strided(a, shape, strides, writeable=False)
+            return view.reshape(result_shape)
+
+        return NpInterval(get_patches(self.lower), get_patches(self.upper))
+
     @staticmethod
     def _reshape_for_padding(layer_input, image_shape, batch_size, padding,
                              value=0.0):
@@ -256,30 +532,45 @@ class NpInterval(Interval):
         h_in = h + 2 * pad_h
         w_in = w + 2 * pad_w
 
-        extra_pixels = np.full((batch_size, n_channels, h_in, w_in), value)
+        # every pixel is written once: value on the border, input inside,
+        # dtype must hold value too, like -inf padding integer input
+        extra_pixels = np.empty((batch_size, n_channels, h_in, w_in),
+                                dtype=np.result_type(layer_input, value))
+        extra_pixels[:, :, :pad_h, :] = value
+        extra_pixels[:, :, (pad_h+h):, :] = value
+        extra_pixels[:, :, pad_h:(pad_h+h), :pad_w] = value
+        extra_pixels[:, :, pad_h:(pad_h+h), (pad_w+w):] = value
         extra_pixels[:, :, pad_h:(pad_h+h), pad_w:(pad_w+w)] = layer_input
         #maybe it will need broadcast_to too
         return extra_pixels
 
-    @staticmethod
-    def select(bool_list, interval_list):
-        lower = [a.lower if isinstance(a, NpInterval) else a
-                 for a in interval_list]
-        upper = [a.upper if isinstance(a, NpInterval) else a
-                 for a in interval_list]
-        return NpInterval(np.select(bool_list, lower),
-                          np.select(bool_list, upper))
-
     def concat(self, other, axis=0):
-        lower = np.concatenate([self.lower, other.lower], axis=axis)
-        upper = np.concatenate([self.upper, other.upper], axis=axis)
-        return NpInterval(lower, upper)
+        return NpInterval.concatenate([self, other], axis=axis)
+
+    @staticmethod
+    def concatenate(intervals, axis=0):
+        lowers = [i.lower for i in intervals]
+        uppers = [i.upper for i in intervals]
+        shape = list(lowers[0].shape)
+        shape[axis] = sum(a.shape[axis] for a in lowers)
+        # both bounds are joined straight into one buffer
+        bounds = _empty_bounds(shape, lowers + uppers)
+        np.concatenate(lowers, axis=axis, out=bounds[0])
+        np.concatenate(uppers, axis=axis, out=bounds[1])
+        return NpInterval._from_bounds(bounds)
 
     @staticmethod
     def stack(intervals, axis=0):
-        lower = np.stack([i.lower for i in intervals], axis=axis)
-        upper = np.stack([i.upper for i in intervals], axis=axis)
-        return NpInterval(lower, upper)
+        lowers = [i.lower for i in intervals]
+        uppers = [i.upper for i in intervals]
+        shape = list(lowers[0].shape)
+        if axis < 0:
+            axis += len(shape) + 1
+        shape.insert(axis, len(lowers))
+        bounds = _empty_bounds(shape, lowers + uppers)
+        np.stack(lowers, axis=axis, out=bounds[0])
+        np.stack(uppers, axis=axis, out=bounds[1])
+        return NpInterval._from_bounds(bounds)
 
     def eval(self, *args):
         """Returns some readable form of stored value."""
@@ -290,9 +581,11 @@ class NpInterval(Interval):
 
         :rtype: NpInterval
         """
-        lower = np.maximum(self.lower, 0.0)
-        upper = np.maximum(self.upper, 0.0)
-        return NpInterval(lower, upper)
+        shape = np.broadcast(self.lower, self.upper).shape
+        bounds = _empty_bounds(shape, (self.lower, self.upper, 0.0))
+        np.maximum(self.lower, 0.0, out=bounds[0, ...])
+        np.maximum(self.upper, 0.0, out=bounds[1, ...])
+        return NpInterval._from_bounds(bounds)
 
     def op_softmax(self, input_shp):
         """Returns result of softmax operation on given NpInterval.
@@ -340,69 +633,62 @@ class NpInterval(Interval):
         half = local_range / 2
         x = self
         sq = self.square()
-        n_channels, h, w = input_shape
-        extra_channels = self.from_shape((n_channels + 2 * half, h, w),
-                                         neutral=True)
-        extra_channels[half:half + n_channels, :, :] = sq
-        s = self.from_shape(input_shape, neutral=True)
-
-        for i in xrange(local_range):
-            if i != half:
-                s += extra_channels[i:i + n_channels, :, :]
-
-        c = s * alpha + k
-
-        def norm((arg_x, arg_c)):
-            return arg_x / np.power(arg_c + alpha * np.square(arg_x), beta)
-
-        def in_range((range_), val):
+        # s - sum of squares of neighbours in local range, which starts half
+        # channels before a channel and has local_range channels, also for
+        # even local_range, both bounds are taken from prefix sums along
+        # channels at once
+        sq_bounds = np.stack([sq.lower, sq.upper])
+        s = _channel_window_sum(sq_bounds, half, axis=1, size=local_range)
+        s -= sq_bounds
+        c_bounds = s * alpha
+        c_bounds += k
+        c = NpInterval._from_valid(c_bounds[0], c_bounds[1])
+
+        # invariants of the loops below: alpha-scaled squares of bounds of x,
+        # computed once for all candidates
+        u_lower = np.square(x.lower)
+        u_lower *= alpha
+        u_upper = np.square(x.upper)
+        u_upper *= alpha
+        extr_coef = 2 * beta - 1
+
+        def norm(args):
+            arg_x, u_x, arg_c = args
+            denominator = _power(arg_c + u_x, beta)
+            return np.divide(arg_x, denominator, out=denominator)
+
+        def in_range(range_, val):
             return np.logical_and(np.less(range_.lower, val),
                                   np.less(val, range_.upper))
 
-        def c_extr_from_x(arg_x):
-            return np.square(arg_x) * ((2 * beta - 1) * alpha)
-
-        def x_extr_from_c(arg_c):
-            return np.sqrt(arg_c / ((2 * beta - 1) * alpha))
-
-        corner_lower = np.full(input_shape, np.inf)
-        corner_upper = np.full(input_shape, -np.inf)
-        corners = [(x.lower, c.lower), (x.lower, c.upper),
-                   (x.upper, c.lower), (x.upper, c.upper)]
-        for corner in corners:
-            corner_lower = np.minimum(corner_lower, norm(corner))
-            corner_upper = np.maximum(corner_upper, norm(corner))
-        res = NpInterval(corner_lower, corner_upper)
+        corners = [(x.lower, u_lower, c.lower), (x.lower, u_lower, c.upper),
+                   (x.upper, u_upper, c.lower), (x.upper, u_upper, c.upper)]
 
+        # each root is computed once and used with both signs
+        u_extr_lower = c.lower / extr_coef
+        u_extr_upper = c.upper / extr_coef
+        x_extr_lower = np.sqrt(u_extr_lower / alpha)
+        x_extr_upper = np.sqrt(u_extr_upper / alpha)
         maybe_extrema = [
-            (0, c.lower), (0, c.upper),
-            (x_extr_from_c(c.lower), c.lower),
-            (x_extr_from_c(c.upper), c.upper),
-            (x_extr_from_c(c.lower) * (-1), c.lower),
-            (x_extr_from_c(c.upper) * (-1), c.upper),
-            (x.lower, c_extr_from_x(x.lower)),
-            (x.upper, c_extr_from_x(x.upper))
+            (0, 0, c.lower), (0, 0, c.upper),
+            (x_extr_lower, u_extr_lower, c.lower),
+            (x_extr_upper, u_extr_upper, c.upper),
+            (-x_extr_lower, u_extr_lower, c.lower),
+            (-x_extr_upper, u_extr_upper, c.upper),
+            (x.lower, u_lower, u_lower * extr_coef),
+            (x.upper, u_upper, u_upper * extr_coef)
         ]
-        extrema_conds = [
-            in_range(x, maybe_extrema[0][0]),
-            in_range(x, maybe_extrema[1][0]),
-            in_range(x, maybe_extrema[2][0]),
-            in_range(x, maybe_extrema[3][0]),
-            in_range(x, maybe_extrema[4][0]),
-            in_range(x, maybe_extrema[5][0]),
-            in_range(c, maybe_extrema[6][1]),
-            in_range(c, maybe_extrema[7][1])
-        ]
-        for m_extr, cond in zip(maybe_extrema, extrema_conds):
-            norm_res = norm(m_extr)
-            res.lower = np.select([cond, True],
-                                  [np.minimum(res.lower, norm_res), res.lower])
-            res.upper = np.select([cond, True],
-                                  [np.maximum(res.upper, norm_res), res.upper])
-        return res
+        # conditions are computed lazily, one candidate at a time
+        extrema_conds = [(x, 0)] * 6 + [(c, 2)] * 2
+        candidates = chain(
+            ((norm(corner), None) for corner in corners),
+            ((norm(m_extr), in_range(range_, m_extr[i]))
+             for m_extr, (range_, i) in zip(maybe_extrema, extrema_conds)))
+        lower, upper = _extrema(input_shape, self.DTYPE, candidates)
+        return NpInterval._from_valid(lower, upper)
 
     def op_conv(self, weights, image_shape, filter_shape, biases, stride,
-                padding, n_groups):
+                padding, n_groups, theano_ops=None):
         """Returns estimated activation of convolution applied to NpInterval.
 
         :param weights: weights tensor in format (number of output channels,
@@ -429,16 +715,25 @@ class NpInterval(Interval):
         :type stride: pair of integers
         :type padding: pair of integers
         :type n_groups: integer
+        :param theano_ops: map in which theano graph might be saved
+        :type theano_ops: map of theano functions
         :rtype: NpInterval
         """
-
-        t_lower, t_upper = T.tensor3(), T.tensor3()
-        result_lower, result_upper = self._theano_op_conv(
-            t_lower, t_upper, weights, image_shape, filter_shape,
-            biases, stride, padding, n_groups
-        )
-        op_conv_function = function([t_lower, t_upper],
-                                    [result_lower, result_upper])
+        if theano_ops is None:
+            theano_ops = {}
+        conv_op_key = ('op_conv', image_shape, filter_shape, stride, padding,
+                       n_groups)
+        if conv_op_key not in theano_ops:
+            if isinstance(weights, np.ndarray):
+                weights = shared(weights)
+            t_lower, t_upper = T.tensor3(), T.tensor3()
+            result_lower, result_upper = self._theano_op_conv(
+                t_lower, t_upper, weights, image_shape, filter_shape,
+                biases, stride, padding, n_groups
+            )
+            theano_ops[conv_op_key] = function([t_lower, t_upper],
+                                               [result_lower, result_upper])
+        op_conv_function = theano_ops[conv_op_key]
 
         lower, upper = op_conv_function(
             self.lower,
@@ -457,18 +752,18 @@ class NpInterval(Interval):
         :returns: Estimated impact of input on output of network
         :rtype: NpInterval
         """
+        # non-negative activation passes derivative through, activation
+        # containing zero might also block it, non-positive one blocks it
+        non_negative = activation.lower >= 0.
         lower_than_zero = activation.upper <= 0.
-        contains_zero = np.logical_and(activation.lower < 0,
-                                       activation.upper > 0)
-
-        der_with_zero_l = np.minimum(self.lower, 0.)
-        der_with_zero_u = np.maximum(self.upper, 0.)
 
-        result_l = np.select([lower_than_zero, contains_zero, True],
-                             [0., der_with_zero_l, self.lower])
-        result_u = np.select([lower_than_zero, contains_zero, True],
-                             [0., der_with_zero_u, self.upper])
-        return NpInterval(result_l, result_u)
+        result_l = np.where(non_negative, self.lower,
+                            np.minimum(self.lower, 0.))
+        result_u = np.where(non_negative, self.upper,
+                            np.maximum(self.upper, 0.))
+        np.copyto(result_l, 0., where=lower_than_zero)
+        np.copyto(result_u, 0., where=lower_than_zero)
+        return NpInterval._from_valid(result_l, result_u)
 
     @staticmethod
     def select(bool_list, interval_list):
@@ -512,50 +807,33 @@ class NpInterval(Interval):
         # fh, fw - pool height, pool width
         fh, fw = poolsize
         stride_h, stride_w = stride
-        output = self
+        output_h = (h - fh) / stride_h + 1
+        output_w = (w - fw) / stride_w + 1
         result = activation.from_shape(input_shape, neutral=True)
 
-        for at_h, at_w in product(xrange(0, h - fh + 1, stride_h),
-                                  xrange(0, w - fw + 1, stride_w)):
-            # at_out_h - height of output corresponding to pool at position
-            # at_h
-            at_out_h = at_h / stride_h
-            # at_out_w - width of output corresponding to pool at position
-            # at_w
-            at_out_w = at_w / stride_w
-
-            for at_f_h, at_f_w in product(xrange(at_h, at_h + fh),
-                                          xrange(at_w, at_w + fw)):
-                # maximum lower and upper value of neighbours
-                neigh_max_low = -np.inf
-                neigh_max_upp = -np.inf
-                neigh_max_low = np.asarray([-np.inf], dtype=config.floatX)
-                neigh_max_upp = np.asarray([-np.inf], dtype=config.floatX)
-                neigh_max_itv = NpInterval(neigh_max_low, neigh_max_upp)
-                act_slice = activation[:, :, at_f_h, at_f_w]
-
-                # setting maximum lower and upper of neighbours
-                for at_f_h_neigh, at_f_w_neigh in \
-                        product(xrange(at_h, at_h + fh),
-                                xrange(at_w, at_w + fw)):
-
-                    if (at_f_h_neigh, at_f_w_neigh) != (at_f_h, at_f_w):
-                        neigh_slice = activation[:, :, at_f_h_neigh,
-                                                 at_f_w_neigh]
-                        neigh_max_itv = neigh_max_itv.max(neigh_slice)
-
-                # must have impact on output
-                must = act_slice.lower > neigh_max_itv.upper
-                # cannot have impact on output
-                cannot = act_slice.upper < neigh_max_itv.lower
-                # or might have impact on output
-                output_slice = output[:, :, at_out_h, at_out_w]
-                output_with_0 = NpInterval(np.minimum(output_slice.lower, 0.),
-                                           np.maximum(output_slice.upper, 0.))
-
-                result[:, :, at_f_h, at_f_w] += \
-                    NpInterval.select([must, cannot, True],
-                                      [output_slice, 0., output_with_0])
+        # all pools are handled at once, last axis of windows is position in
+        # pool
+        offsets = list(_pool_offsets(poolsize, stride, (output_h, output_w)))
+        act_lower = np.stack([activation.lower[at] for at in offsets],
+                             axis=-1)
+        act_upper = np.stack([activation.upper[at] for at in offsets],
+                             axis=-1)
+
+        # must have impact on output
+        must = act_lower > _max_of_others(act_upper)
+        # cannot have impact on output
+        cannot = act_upper < _max_of_others(act_lower)
+        # or might have impact on output
+        out_lower = self.lower[:, :, :output_h, :output_w, np.newaxis]
+        out_upper = self.upper[:, :, :output_h, :output_w, np.newaxis]
+        lower = np.where(must, out_lower, np.where(
+            cannot, 0., np.minimum(out_lower, 0.)))
+        upper = np.where(must, out_upper, np.where(
+            cannot, 0., np.maximum(out_upper, 0.)))
+
+        for i, at in enumerate(offsets):
+            result.lower[at] += lower[..., i]
+            result.upper[at] += upper[..., i]
 
         return result[:, :, pad_h:h - pad_h, pad_w:w - pad_w]
 
@@ -589,24 +867,16 @@ class NpInterval(Interval):
         # fh, fw - pool height, pool width
         fh, fw = poolsize
         stride_h, stride_w = stride
-        output = self
+        output_h = (h - fh) / stride_h + 1
+        output_w = (w - fw) / stride_w + 1
         result = activation.from_shape(input_shape, neutral=True)
-
-        for at_h, at_w in product(xrange(0, h - fh + 1, stride_h),
-                                  xrange(0, w - fw + 1, stride_w)):
-            # at_out_h - height of output corresponding to pool at position
-            # at_h
-            at_out_h = at_h / stride_h
-            # at_out_w - width of output corresponding to pool at position
-            # at_w
-            at_out_w = at_w / stride_w
-
-            output_slice = output[:, :, at_out_h, at_out_w].\
-                reshape((n_batches, n_in, 1, 1))
-
-            result_slice = result[:, :, at_h:at_h + fh, at_w:at_w + fw]
-            result_slice += output_slice
-            result[:, :, at_h:at_h + fh, at_w:at_w + fw] = result_slice
+        # bounds are updated directly, once for every position in pool
+        # instead of once for every pool
+        out_lower = self.lower[:, :, :output_h, :output_w]
+        out_upper = self.upper[:, :, :output_h, :output_w]
+        for at in _pool_offsets(poolsize, stride, (output_h, output_w)):
+            result.lower[at] += out_lower
+            result.upper[at] += out_upper
 
         result /= np.prod(poolsize)
         return result[:, :, pad_h:h - pad_h, pad_w:w - pad_w]
@@ -630,7 +900,36 @@ class NpInterval(Interval):
         :param float beta: local range normalization beta argument
         :rtype: NpInterval
         """
-        return self
+        # bounds of impact are minima and maxima of the same candidates, so
+        # they are ordered and are not checked again
+        # batches and rows of pixels are independent, rows are split between
+        # threads when there are too few batches
+        n_cpus = cpu_count()
+        axis = 0 if input_shape[0] >= n_cpus else 2
+        n_parts = input_shape[axis]
+        n_threads = min(n_cpus, n_parts)
+        if n_threads < 2:
+            lower, upper = _d_norm((activation.lower, activation.upper),
+                                   (self.lower, self.upper), input_shape[1],
+                                   local_range, k, alpha, beta)
+            return NpInterval._from_valid(lower, upper)
+
+        bounds = _empty_bounds(activation.lower.shape,
+                               (activation.lower, activation.upper,
+                                self.lower, self.upper))
+
+        def count_part(part):
+            at = (slice(None), ) * axis + (part, )
+            _d_norm((activation.lower[at], activation.upper[at]),
+                    (self.lower[at], self.upper[at]), input_shape[1],
+                    local_range, k, alpha, beta,
+                    out=(bounds[0][at], bounds[1][at]))
+
+        # numpy releases the GIL in heavy operations
+        step = -(-n_parts // n_threads)
+        _get_thread_pool().map(count_part, [slice(at, at + step) for at in
+                                            xrange(0, n_parts, step)])
+        return NpInterval._from_valid(bounds[0], bounds[1])
 
     def op_d_conv(self, input_shape, filter_shape, weights,
                   stride, padding, n_groups, theano_ops=None):
@@ -668,6 +967,8 @@ class NpInterval(Interval):
         :rtype: NpInterval
         """
 
+        if theano_ops is None:
+            theano_ops = {}
         # n_in, h, w - number of input channels, image height, image width
         n_batches, n_in, h, w = input_shape
         # n_out, fh, fw - number of output channels, filter height, filter
@@ -701,14 +1002,14 @@ class NpInterval(Interval):
             op_input = output
             op_low = op_input.lower
             op_upp = op_input.upper
-            op_weights = np.swapaxes(weights, 0, 1)
-            op_g_n_in = op_n_in / op_n_groups
-            op_weights = [op_weights[:, i * op_g_n_in:(i + 1) * op_g_n_in,
-                                     :, :] for i in xrange(op_n_groups)]
-            op_weights = np.concatenate(op_weights, axis=0)
             conv_op_key = (op_image_shape, op_filter_shape, op_padding,
                            op_n_groups)
             if conv_op_key not in theano_ops:
+                op_weights = np.swapaxes(weights, 0, 1)
+                op_g_n_in = op_n_in / op_n_groups
+                op_weights = [op_weights[:, i * op_g_n_in:(i + 1) * op_g_n_in,
+                                         :, :] for i in xrange(op_n_groups)]
+                op_weights = shared(np.concatenate(op_weights, axis=0))
                 t_lower, t_upper = T.tensor4(), T.tensor4()
                 result_lower, result_upper = self._theano_op_conv(
                     t_lower, t_upper, op_weights, op_image_shape,
@@ -726,9 +1027,13 @@ class NpInterval(Interval):
         result = NpInterval.from_shape(padded_input_shape, neutral=True)
         # see: flipping kernel
         # in theano.conv_2d flipped kernel is used
-        weights = weights[:, :, ::-1, ::-1]
+        weights = weights[:, :, ::-1, ::-1].reshape((n_out, g_in, fh * fw))
         weights_neg = np.minimum(weights, 0.0)
         weights_pos = np.maximum(weights, 0.0)
+        output_h = (h - fh) / stride_h + 1
+        output_w = (w - fw) / stride_w + 1
+        out_lower = output.lower[:, :, :output_h, :output_w]
+        out_upper = output.upper[:, :, :output_h, :output_w]
 
         for at_g in xrange(n_groups):
             # beginning and end of at_g'th group of input channel in input
@@ -739,43 +1044,28 @@ class NpInterval(Interval):
             at_out_from = at_g * g_out
             at_out_to = at_out_from + g_out
 
-            for at_h, at_w in product(xrange(0, h - fh + 1, stride_h),
-                                      xrange(0, w - fw + 1, stride_w)):
-                # at_out_h - height of output corresponding to filter at
-                # position at_h
-                at_out_h = at_h / stride_h
-                # at_out_w - height of output corresponding to filter at
-                # position at_w
-                at_out_w = at_w / stride_w
-
-                # weights slice that impacts on (at_out_h, at_out_w) in
-                # output
-                weights_pos_slice = weights_pos[at_out_from:at_out_to, :, :, :]
-                weights_neg_slice = weights_neg[at_out_from:at_out_to, :, :, :]
-                # shape of weights_slice: (g_out, g_in, h, w)
-
-                # slice of output
-                out_slice_low = output.lower[:, at_out_from:at_out_to,
-                                             at_out_h, at_out_w]
-                out_slice_low = \
-                    out_slice_low.reshape((n_batches, g_out, 1, 1, 1))
-                out_slice_upp = output.upper[:, at_out_from:at_out_to,
-                                             at_out_h, at_out_w]
-                out_slice_upp = \
-                    out_slice_upp.reshape((n_batches, g_out, 1, 1, 1))
-
-                # results
-                res_low_pos = (out_slice_low * weights_pos_slice).sum(axis=1)
-                res_low_neg = (out_slice_low * weights_neg_slice).sum(axis=1)
-                res_upp_pos = (out_slice_upp * weights_pos_slice).sum(axis=1)
-                res_upp_neg = (out_slice_upp * weights_neg_slice).sum(axis=1)
-
-                res_slice_lower = res_low_pos + res_upp_neg
-                res_slice_upper = res_upp_pos + res_low_neg
-                res_slice = NpInterval(res_slice_lower, res_slice_upper)
-
-                result[:, at_in_from:at_in_to, at_h:(at_h + fh),
-                       at_w:(at_w + fw)] += res_slice
+            out_slice_low = out_lower[:, at_out_from:at_out_to]
+            out_slice_upp = out_upper[:, at_out_from:at_out_to]
+            res_lower = result.lower[:, at_in_from:at_in_to]
+            res_upper = result.upper[:, at_in_from:at_in_to]
+            # every position in filter is handled at once for all positions
+            # of filter in image, as a product over output channels
+            for at_f, at in enumerate(_pool_offsets((fh, fw), stride,
+                                                    (output_h, output_w))):
+                # shape of weights slices: (g_out, g_in)
+                w_pos = weights_pos[at_out_from:at_out_to, :, at_f]
+                w_neg = weights_neg[at_out_from:at_out_to, :, at_f]
+                # shape of products: (n_batches, height, width, g_in)
+                res_slice_lower = np.tensordot(out_slice_low, w_pos,
+                                               axes=(1, 0))
+                res_slice_lower += np.tensordot(out_slice_upp, w_neg,
+                                                axes=(1, 0))
+                res_slice_upper = np.tensordot(out_slice_upp, w_pos,
+                                               axes=(1, 0))
+                res_slice_upper += np.tensordot(out_slice_low, w_neg,
+                                                axes=(1, 0))
+                res_lower[at] += res_slice_lower.transpose(0, 3, 1, 2)
+                res_upper[at] += res_slice_upper.transpose(0, 3, 1, 2)
 
         # remove padding
         result = result[:, :, pad_h:(h - pad_h), pad_w:(w - pad_w)]
@@ -790,5 +1080,421 @@ class NpInterval(Interval):
                   different "1" in every batch, like numpy.eye(n_outputs)
         :rtype: NpInterval
         """
-        np_matrix = np.eye(n_outputs, dtype=config.floatX)
+        np_matrix = np.eye(n_outputs, dtype=NpInterval.DTYPE)
         return NpInterval(np_matrix, np_matrix)
+
+
+def _in_range(lower, upper, value):
+    """Returns whether values lie strictly between lower and upper bounds.
+
+    :rtype: numpy.ndarray of bool
+    """
+    return np.logical_and(lower < value, value < upper)
+
+
+def _empty_bounds(shape, arrays):
+    """Returns uninitialised buffer for both bounds of NpInterval, to be
+    used with NpInterval._from_bounds.
+
+    Bounds are to be written through bounds[0, ...] and bounds[1, ...],
+    which stay arrays even for 0-d bounds, unlike bounds[0] and bounds[1].
+
+    :param shape: shape of a single bound
+    :param arrays: operands the bounds are computed from, they determine
+                   dtype of the buffer
+    :rtype: numpy.ndarray of shape (2, ) + shape
+    """
+    return np.empty((2, ) + tuple(shape), dtype=np.result_type(*arrays))
+
+
+_thread_pool = None
+_thread_pool_lock = Lock()
+
+
+def _close_thread_pool():
+    """Closes pool returned by _get_thread_pool and waits for its threads."""
+    if _thread_pool is not None:
+        _thread_pool.close()
+        _thread_pool.join()
+
+
+def _get_thread_pool():
+    """Returns pool of cpu_count() threads shared by all operations, so that
+    threads are not started again for every layer and every batch.
+
+    The pool is created once, on first use, and closed at exit.
+
+    :rtype: multiprocessing.pool.ThreadPool
+    """
+    global _thread_pool
+    with _thread_pool_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPool(cpu_count())
+            atexit.register(_close_thread_pool)
+    return _thread_pool
+
+
+def _power(a, exponent):
+    """Returns a ** exponent for non-negative a.
+
+    Fractional exponents being multiples of 1/4, like beta = 0.75 usual in
+    local range normalization and beta + 1, are computed with square roots
+    and multiplications, which are much cheaper than generic np.power.
+
+    :param a: non-negative base
+    :type a: numpy.ndarray or float
+    :param float exponent: exponent
+    :rtype: numpy.ndarray or float
+    """
+    quarters = exponent * 4
+    if quarters != int(quarters) or int(quarters) % 4 == 0 or \
+            not 0 < quarters < 16:
+        return np.power(a, exponent)
+    whole, quarter = divmod(int(quarters), 4)
+    root = np.sqrt(a)
+    if quarter == 2:
+        result = root
+    else:
+        result = np.sqrt(root)
+        if quarter == 3:
+            result *= root
+    for _ in xrange(whole):
+        result *= a
+    return result
+
+
+def _extrema(shape, dtype, candidates):
+    """Returns minimal and maximal candidate values.
+
+    :param tuple shape: shape of result
+    :param dtype: dtype of result
+    :param candidates: iterable of pairs (value, condition), where value is
+                       taken into account only where condition holds,
+                       condition None means that value is always attained
+    :returns: lower and upper bound
+    :rtype: pair of numpy.ndarray
+
+    .. note:: Candidates are consumed one by one and folded into bounds in
+              place, so only one candidate is materialized at a time.
+              Values not attained are replaced with NaN, which np.fmin and
+              np.fmax skip, as masked ufuncs with where= are much slower.
+    """
+    bounds = np.empty((2, ) + shape, dtype=dtype)
+    lower, upper = bounds[0, ...], bounds[1, ...]
+    lower.fill(np.inf)
+    upper.fill(-np.inf)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for value, cond in candidates:
+            if cond is None:
+                np.minimum(lower, value, out=lower)
+                np.maximum(upper, value, out=upper)
+            else:
+                value = np.where(cond, value, np.nan)
+                np.fmin(lower, value, out=lower)
+                np.fmax(upper, value, out=upper)
+    return lower, upper
+
+
+def _product_bounds(a, b, out=None, ufunc=np.multiply):
+    """Returns bounds of interval product of a and b.
+
+    Works on pairs of bounds rather than NpIntervals, so no bounds check is
+    run for the factors and the product.
+
+    :param a: pair of lower and upper bound of first factor
+    :param b: pair of lower and upper bound of second factor
+    :param out: pair of arrays of broadcast shape the bounds are written to,
+                new buffer is allocated if None
+    :param ufunc: np.multiply, or np.divide for bounds of quotient of a and
+                  b, where b should not contain zero
+    :returns: lower bound at index 0 and upper bound at index 1
+    :rtype: numpy.ndarray or out
+
+    .. note:: Products of bounds are folded into extrema one by one, so only
+              one of them is materialized at a time.
+    """
+    if out is None:
+        shape = np.broadcast(a[0], a[1], b[0], b[1]).shape
+        out = _empty_bounds(shape, (a[0], a[1], b[0], b[1]))
+        lower, upper = out[0, ...], out[1, ...]
+    else:
+        lower, upper = out
+    product_ = np.empty_like(lower)
+    ufunc(a[0], b[0], out=lower)
+    ufunc(a[0], b[1], out=product_)
+    np.maximum(lower, product_, out=upper)
+    np.minimum(lower, product_, out=lower)
+    for a_bound, b_bound in ((a[1], b[0]), (a[1], b[1])):
+        ufunc(a_bound, b_bound, out=product_)
+        np.minimum(lower, product_, out=lower)
+        np.maximum(upper, product_, out=upper)
+    return out
+
+
+def _scaled_bounds(a, other, ufunc):
+    """Returns bounds of interval a multiplied or divided by plain values.
+
+    :param a: pair of lower and upper bound
+    :param other: numpy.ndarray or number
+    :param ufunc: np.multiply or np.divide, other should not contain zero
+                  for the latter
+    :returns: lower bound at index 0 and upper bound at index 1
+    :rtype: numpy.ndarray
+    """
+    operands = (a[0], a[1], other)
+    bounds = _empty_bounds(np.broadcast(*operands).shape, operands)
+    lower, upper = bounds[0, ...], bounds[1, ...]
+    # order of bounds is kept by non-negative values and reversed by
+    # non-positive ones
+    if np.all(other >= 0.0):
+        ufunc(a[0], other, out=lower)
+        ufunc(a[1], other, out=upper)
+    elif np.all(other <= 0.0):
+        ufunc(a[1], other, out=lower)
+        ufunc(a[0], other, out=upper)
+    else:
+        ufunc(a[0], other, out=lower)
+        ufunc(a[1], other, out=upper)
+        smaller = np.minimum(lower, upper)
+        np.maximum(lower, upper, out=upper)
+        np.copyto(lower, smaller)
+    return bounds
+
+
+def _mul_add(result, a, b):
+    """Adds interval product of a and b to result in place.
+
+    :param result: pair of lower and upper bound to be increased, might be
+                   views
+    :param a: pair of lower and upper bound of first factor
+    :param b: pair of lower and upper bound of second factor
+    """
+    lower, upper = _product_bounds(a, b)
+    np.add(result[0], lower, out=result[0])
+    np.add(result[1], upper, out=result[1])
+
+
+def _max_of_others(a):
+    """For every element returns maximum of other elements along last axis.
+
+    :param numpy.ndarray a: array with at least two elements along last axis
+    :rtype: numpy.ndarray
+    """
+    at_max = a.argmax(axis=-1)[..., np.newaxis]
+    top_two = np.sort(a, axis=-1)[..., -2:]
+    is_max = np.arange(a.shape[-1]) == at_max
+    return np.where(is_max, top_two[..., :1], top_two[..., 1:])
+
+
+def _pool_offsets(poolsize, stride, output_size):
+    """Yields, for every position in pool, slice of input taken by this
+    position in all pools.
+
+    :param pair of integers poolsize: pool size in format (height, width)
+    :param pair of integers stride: stride of pool
+    :param pair of integers output_size: number of pools along height and
+                                         width
+    :rtype: generator of tuples of slices, to index arrays in format
+            (batch size, number of channels, height, width)
+    """
+    fh, fw = poolsize
+    stride_h, stride_w = stride
+    output_h, output_w = output_size
+    for at_f_h, at_f_w in product(xrange(fh), xrange(fw)):
+        yield (slice(None), slice(None),
+               slice(at_f_h, at_f_h + stride_h * output_h, stride_h),
+               slice(at_f_w, at_f_w + stride_w * output_w, stride_w))
+
+
+def _channel_window_sum(a, half, axis=1, size=None):
+    """Returns sums of a over windows of channels, using prefix sums.
+
+    :param numpy.ndarray a: array with channels along given axis
+    :param integer half: number of channels before channel j in its window
+    :param integer axis: axis of channels
+    :param size: number of channels in window, sum for channel j is taken
+                 over channels from j - half to j - half + size - 1,
+                 2 * half + 1 if None
+    :type size: integer or None
+    :rtype: numpy.ndarray
+    """
+    if size is None:
+        size = 2 * half + 1
+    n_channels = a.shape[axis]
+    prefix_shape = list(a.shape)
+    prefix_shape[axis] += 1
+    prefix = np.zeros(prefix_shape, dtype=a.dtype)
+    at = [slice(None)] * a.ndim
+    at[axis] = slice(1, None)
+    np.cumsum(a, axis=axis, out=prefix[tuple(at)])
+    channels = np.arange(n_channels)
+    upper_at = np.clip(channels - half + size, 0, n_channels)
+    lower_at = np.clip(channels - half, 0, n_channels)
+    # gathered upper ends are a fresh array, so difference is stored there
+    window = np.take(prefix, upper_at, axis=axis)
+    return np.subtract(window, np.take(prefix, lower_at, axis=axis),
+                       out=window)
+
+
+def _d_norm(act, der, n_channels, local_range, k, alpha, beta, out=None):
+    """Returns bounds of estimated impact of input of norm layer on output of
+    network, computed on plain arrays of bounds.
+
+    :param act: pair of lower and upper bound of activation of input
+    :param der: pair of lower and upper bound of impact of output of layer
+                on output of network
+    :param integer n_channels: number of channels
+    :param integer local_range: size of local range in local range
+                                normalization
+    :param float k: local range normalization k argument
+    :param float alpha: local range normalization alpha argument
+    :param float beta: local range normalization beta argument
+    :param out: pair of lower and upper bound the impact is written to, new
+                arrays are allocated if None
+    :returns: lower and upper bound of impact, all arrays are in format
+              (batch size, number of channels, height, width)
+    :rtype: pair of numpy.ndarray
+    """
+    half = local_range / 2
+    act_lower, act_upper = act
+    der_lower, der_upper = der
+    shape = act_lower.shape
+    dtype = act_lower.dtype
+
+    # u - alpha * x^2 for every activation x, bounds computed like in
+    # square(), u of bounds are reused by neighbour candidates, so alpha is
+    # not multiplied in again for every candidate
+    ll = np.square(act_lower)
+    ll *= alpha
+    uu = np.square(act_upper)
+    uu *= alpha
+    act_has_zero = np.logical_and(act_lower <= 0, act_upper >= 0)
+    u = np.empty((2, ) + shape, dtype=dtype)
+    u_lower, u_upper = u
+    np.minimum(ll, uu, out=u_lower)
+    np.copyto(u_lower, 0., where=act_has_zero)
+    np.maximum(ll, uu, out=u_upper)
+
+    # c - k plus u of neighbours of a channel in local range, both bounds
+    # summed in one pass
+    c = _channel_window_sum(u, half, axis=2) - u + k
+
+    mid_lower, mid_upper = _extrema(shape, dtype,
+                                    _d_norm_mid_candidates(u, c, beta))
+    # impact of middle elements is written straight to result, impact of
+    # neighbours is accumulated on it
+    res_lower, res_upper = _product_bounds((mid_lower, mid_upper),
+                                           (der_lower, der_upper), out=out)
+
+    # impact of neighbours is added with one slice update per offset and
+    # direction, both directions of an offset are evaluated at once and
+    # share a mask of zero containing pairs
+    for i in xrange(1, min(half, n_channels - 1) + 1):
+        near = slice(0, n_channels - i)
+        far = slice(i, n_channels)
+        has_zero = np.logical_or(act_has_zero[:, near],
+                                 act_has_zero[:, far])
+        # y - middle element, x - its neighbour in distance i, first axis
+        # is direction: x above y, then x below y
+        x = (np.stack([act_lower[:, far], act_lower[:, near]]),
+             np.stack([act_upper[:, far], act_upper[:, near]]))
+        x_u = (np.stack([ll[:, far], ll[:, near]]),
+               np.stack([uu[:, far], uu[:, near]]))
+        y = (x[0][::-1], x[1][::-1])
+        y_u = (x_u[0][::-1], x_u[1][::-1])
+        # candidates for both bounds of c are evaluated at once, along
+        # first axis
+        c_neigh = np.stack([c[:, :, near] - u[:, :, far],
+                            c[:, :, far] - u[:, :, near]], axis=1)
+        candidates = chain(
+            _d_norm_neigh_candidates(x, y, x_u, y_u, c_neigh, alpha, beta),
+            [(0., has_zero)])
+        neigh_lower, neigh_upper = _extrema(c_neigh.shape, dtype, candidates)
+        neigh_lower = neigh_lower.min(axis=0)
+        neigh_upper = neigh_upper.max(axis=0)
+        for at, x_at, y_at in ((0, far, near), (1, near, far)):
+            _mul_add((res_lower[:, x_at], res_upper[:, x_at]),
+                     (neigh_lower[at], neigh_upper[at]),
+                     (der_lower[:, y_at], der_upper[:, y_at]))
+    return res_lower, res_upper
+
+
+def _d_norm_mid(u, c, beta):
+    """Returns impact of middle element in local range on output of LRN, as
+    a function of u = alpha * x^2 and c."""
+    # denominator is a fresh array, so quotient is written over it
+    denominator = _power(u + c, beta + 1)
+    numerator = u * (1 - 2 * beta)
+    numerator += c
+    return np.divide(numerator, denominator, out=denominator)
+
+
+def _d_norm_mid_candidates(u, c, beta):
+    """Returns candidates for extrema of _d_norm_mid on box u x c.
+
+    :param u: pair of lower and upper bounds of u
+    :param c: pair of lower and upper bounds of c
+    :param float beta: local range normalization beta argument
+    :rtype: generator of pairs (value, condition)
+    """
+    for arg_u, arg_c in product(u, c):
+        yield _d_norm_mid(arg_u, arg_c, beta), None
+    for arg_u in u:
+        arg_c = arg_u * (1 + 2 * beta)
+        yield _d_norm_mid(arg_u, arg_c, beta), _in_range(c[0], c[1], arg_c)
+    if 2 * beta > 1:
+        for arg_c in c:
+            arg_u = arg_c * 3 / (2 * beta - 1)
+            yield _d_norm_mid(arg_u, arg_c, beta), _in_range(u[0], u[1], arg_u)
+
+
+def _d_norm_neigh(xy, u_sum, c, alpha, beta):
+    """Returns impact of neighbour x of middle element y in local range on
+    output of LRN, given x * y and alpha * (x^2 + y^2)."""
+    # denominator is a fresh array of shape of result, so quotient is
+    # written over it
+    denominator = _power(u_sum + c, beta + 1)
+    np.divide(xy, denominator, out=denominator)
+    denominator *= -2 * alpha * beta
+    return denominator
+
+
+def _d_norm_neigh_candidates(x, y, x_u, y_u, c, alpha, beta):
+    """Returns candidates for extrema of _d_norm_neigh on box x * y with
+    fixed c.
+
+    :param x: pair of lower and upper bounds of x
+    :param y: pair of lower and upper bounds of y
+    :param x_u: pair of alpha * squares of lower and upper bounds of x
+    :param y_u: pair of alpha * squares of lower and upper bounds of y
+    :param numpy.ndarray c: value of c
+    :rtype: generator of pairs (value, condition)
+    """
+    for (arg_x, u_x), (arg_y, u_y) in product(zip(x, x_u), zip(y, y_u)):
+        yield _d_norm_neigh(arg_x * arg_y, u_x + u_y, c, alpha, beta), None
+    # extrema on edges of the box, _d_norm_neigh is symmetric and odd in
+    # each argument, so value at -arg_b is just negated; scalar factors of
+    # roots are computed once instead of dividing whole arrays by them
+    edge_scale = 1. / (2 * beta + 1)
+    edge_root_scale = 1. / math.sqrt(alpha * (2 * beta + 1))
+    for a, a_u, b in ((x, x_u, y), (y, y_u, x)):
+        for arg_a, u_a in zip(a, a_u):
+            u_ac = u_a + c
+            u_b = u_ac * edge_scale
+            arg_b = np.sqrt(u_ac, out=u_ac)
+            arg_b *= edge_root_scale
+            value = _d_norm_neigh(arg_a * arg_b, u_a + u_b, c, alpha, beta)
+            yield value, _in_range(b[0], b[1], arg_b)
+            yield -value, _in_range(b[0], b[1], -arg_b)
+    # extrema inside the box, at (t, t), (-t, -t) with the same value and at
+    # (t, -t), (-t, t) with the opposite one
+    u_t = c * (1. / (2 * beta))
+    sq_t = u_t * (1. / alpha)
+    t = np.sqrt(sq_t)
+    value = _d_norm_neigh(sq_t, 2 * u_t, c, alpha, beta)
+    x_t, x_neg_t = _in_range(x[0], x[1], t), _in_range(x[0], x[1], -t)
+    y_t, y_neg_t = _in_range(y[0], y[1], t), _in_range(y[0], y[1], -t)
+    yield value, np.logical_or(np.logical_and(x_t, y_t),
+                               np.logical_and(x_neg_t, y_neg_t))
+    yield -value, np.logical_or(np.logical_and(x_t, y_neg_t),
+                                np.logical_and(x_neg_t, y_t))
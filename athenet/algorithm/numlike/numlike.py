@@ -233,6 +233,19 @@ class Numlike(object):
         """
         raise NotImplementedError
 
+    def patches(self, patch_shape, stride=(1, 1)):
+        """Returns every patch of Numlike that a filter is applied to.
+
+        :param patch_shape: patch shape in format (height, width)
+        :type patch_shape: pair of integers
+        :param stride: pair representing interval at which patches are taken
+        :type stride: pair of integers
+        :returns: patches in format (number of channels,
+                  patch height * patch width, output height, output width)
+        :rtype: Numlike
+        """
+        raise NotImplementedError
+
     @staticmethod
     def stack(numlikes, axis=0):
         """ Takes a sequence of numlikes and stack them on given axis
@@ -246,6 +259,18 @@ class Numlike(object):
         """
         raise NotImplementedError
 
+    @staticmethod
+    def concatenate(numlikes, axis=0):
+        """ Takes a sequence of numlikes and joins them along given axis
+        to make a single numlike.
+
+        :param numlikes: numlikes of the same shape except for dimension axis
+        :type numlikes: array or tuple of Numlikes
+        :param int axis: the axis along which numlikes will be joined
+        :rtype: Numlike
+        """
+        raise NotImplementedError
+
     def eval(self, *args):
         """Returns some readable form of stored value."""
         raise NotImplementedError
@@ -281,7 +306,7 @@ class Numlike(object):
         raise NotImplementedError
 
     def op_conv(self, weights, image_shape, filter_shape, biases, stride,
-                padding, n_groups):
+                padding, n_groups, theano_ops=None):
         """Returns estimated activation of convolution applied to Numlike.
 
         :param weights: weights tensor in format (number of output channels,
@@ -307,6 +332,8 @@ class Numlike(object):
         :type stride: pair of integers
         :type padding: pair of integers
         :type n_groups: integer
+        :param theano_ops: map in which theano graph might be saved
+        :type theano_ops: map of theano functions
         :rtype: Numlike
         """
         raise NotImplementedError
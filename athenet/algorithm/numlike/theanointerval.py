@@ -266,6 +266,12 @@ class TheanoInterval(Interval):
         return misc_reshape_for_padding(layer_input, image_shape,
                                         batch_size, padding, value)
 
+    @staticmethod
+    def concatenate(intervals, axis=0):
+        lower = T.concatenate([i.lower for i in intervals], axis=axis)
+        upper = T.concatenate([i.upper for i in intervals], axis=axis)
+        return TheanoInterval(lower, upper)
+
     @staticmethod
     def stack(intervals, axis=0):
         lower = T.stack([i.lower for i in intervals], axis=axis)
@@ -370,18 +376,22 @@ class TheanoInterval(Interval):
         extra_channels = self.from_shape((n_channels + 2 * half, h, w),
                                          neutral=True)
         extra_channels[half:half + n_channels, :, :] = sq
-        s = self.from_shape(input_shape, neutral=True)
-
-        for i in xrange(local_range):
-            if i != half:
-                s += extra_channels[i:i + n_channels, :, :]
+        # s is sum of squares of neighbours in local range, it is taken from
+        # prefix sums along channels of both bounds at once
+        extra_sq = T.stack([extra_channels.lower, extra_channels.upper])
+        prefix = T.cumsum(extra_sq, axis=1)
+        s_bounds = prefix[:, local_range - 1:local_range - 1 + n_channels] \
+            - prefix[:, :n_channels] + extra_sq[:, :n_channels] \
+            - T.stack([sq.lower, sq.upper])
+        s = TheanoInterval(s_bounds[0], s_bounds[1])
 
         c = s * alpha + k
 
-        def norm((arg_x, arg_c)):
+        def norm(args):
+            arg_x, arg_c = args
             return arg_x / T.power(arg_c + alpha * T.sqr(arg_x), beta)
 
-        def in_range((range_), val):
+        def in_range(range_, val):
             return T.and_(T.le(range_.lower, val), T.le(val, range_.upper))
 
         def c_extr_from_x(arg_x):
@@ -390,14 +400,8 @@ class TheanoInterval(Interval):
         def x_extr_from_c(arg_c):
             return T.sqrt(arg_c / ((2 * beta - 1) * alpha))
 
-        res = TheanoInterval.from_shape(input_shape, lower_val=numpy.inf,
-                                        upper_val=-numpy.inf)
         corners = [(x.lower, c.lower), (x.lower, c.upper),
                    (x.upper, c.lower), (x.upper, c.upper)]
-        for corner in corners:
-            res.lower = T.minimum(res.lower, norm(corner))
-            res.upper = T.maximum(res.upper, norm(corner))
-
         maybe_extrema = [
             (shared(0), c.lower), (shared(0), c.upper),
             (x_extr_from_c(c.lower), c.lower),
@@ -417,16 +421,13 @@ class TheanoInterval(Interval):
             in_range(c, maybe_extrema[6][1]),
             in_range(c, maybe_extrema[7][1])
         ]
-        for m_extr, cond in zip(maybe_extrema, extrema_conds):
-            norm_res = norm(m_extr)
-            res.lower = T.switch(cond, T.minimum(res.lower, norm_res),
-                                 res.lower)
-            res.upper = T.switch(cond, T.maximum(res.upper, norm_res),
-                                 res.upper)
-        return res
+        return TheanoInterval(*_min_max(
+            [norm(corner) for corner in corners],
+            [(norm(m_extr), cond)
+             for m_extr, cond in zip(maybe_extrema, extrema_conds)]))
 
     def op_conv(self, weights, image_shape, filter_shape, biases, stride,
-                padding, n_groups):
+                padding, n_groups, theano_ops=None):
         """Returns estimated activation of convolution
         applied to TheanoInterval.
 
@@ -453,6 +454,8 @@ class TheanoInterval(Interval):
         :type stride: pair of integers
         :type padding: pair of integers
         :type n_groups: integer
+        :param theano_ops: map in which theano graph might be saved
+        :type theano_ops: map of theano functions
         :rtype: TheanoInterval
         """
         lower, upper = self._theano_op_conv(self.lower, self.upper,
@@ -665,23 +668,24 @@ class TheanoInterval(Interval):
         extra_sq_x_upp = T.set_subtensor(extra_sq_x_upp[:,
                                          half:half + n_channels, :, :],
                                          sq_x.upper)
-        s_low = T.zeros_like(x_low, dtype=theano.config.floatX)
-        s_upp = T.zeros_like(x_upp, dtype=theano.config.floatX)
-        # s is sum of squares of elements in local range except middle
-        s = TheanoInterval(s_low, s_upp)
-        for i in xrange(local_range):
-            if i != half:
-                s.lower += extra_sq_x_low[:, i:i + n_channels, :, :]
-                s.upper += extra_sq_x_upp[:, i:i + n_channels, :, :]
+        # s is sum of squares of elements in local range except middle, it is
+        # taken from prefix sums along channels of both bounds at once
+        extra_sq_x = T.stack([extra_sq_x_low, extra_sq_x_upp])
+        prefix = T.cumsum(extra_sq_x, axis=2)
+        s_bounds = prefix[:, :, local_range - 1:local_range - 1 + n_channels] \
+            - prefix[:, :, :n_channels] + extra_sq_x[:, :, :n_channels] \
+            - T.stack([sq_x.lower, sq_x.upper])
+        s = TheanoInterval(s_bounds[0], s_bounds[1])
         c = s * alpha + k
 
         # impact of middle element in local_range on output
-        def mid_d_norm((arg_x, arg_c)):
+        def mid_d_norm(args):
+            arg_x, arg_c = args
             sq_x_a = T.sqr(arg_x) * alpha
             return (sq_x_a * (1 - 2 * beta) + arg_c) / \
                 T.power(sq_x_a + arg_c, beta + 1)
 
-        def in_range((range_), val):
+        def in_range(range_, val):
             return T.and_(T.lt(range_.lower, val), T.lt(val, range_.upper))
 
         def c_extr_from_x1(arg_x):
@@ -696,13 +700,8 @@ class TheanoInterval(Interval):
         def x_extr_from_c2(arg_c):
             return T.sqrt(arg_c / (alpha * (2 * beta + 1)))
 
-        mid_impact = TheanoInterval.from_shape(
-            input_shape, lower_val=numpy.inf, upper_val=-numpy.inf)
         corners = [(x.lower, c.lower), (x.lower, c.upper),
                    (x.upper, c.lower), (x.upper, c.upper)]
-        for corner in corners:
-            mid_impact.lower = T.minimum(mid_impact.lower, mid_d_norm(corner))
-            mid_impact.upper = T.maximum(mid_impact.upper, mid_d_norm(corner))
         mid_maybe_extrema = [
             (shared(0), c.lower),
             (shared(0), c.upper),
@@ -735,19 +734,17 @@ class TheanoInterval(Interval):
             in_range(c, mid_maybe_extrema[12][1]),
             in_range(c, mid_maybe_extrema[13][1])
         ]
-        for m_extr, cond in zip(mid_maybe_extrema, mid_extrema_conds):
-            mid_impact.lower = \
-                T.switch(cond, T.minimum(mid_impact.lower, mid_d_norm(m_extr)),
-                         mid_impact.lower)
-            mid_impact.upper = \
-                T.switch(cond, T.maximum(mid_impact.upper, mid_d_norm(m_extr)),
-                         mid_impact.upper)
+        mid_impact = TheanoInterval(*_min_max(
+            [mid_d_norm(corner) for corner in corners],
+            [(mid_d_norm(m_extr), cond)
+             for m_extr, cond in zip(mid_maybe_extrema, mid_extrema_conds)]))
         mid_impact = mid_impact * output
 
         # impact of neighbours of middle element in local_range on output
         neigh_impact = TheanoInterval.from_shape(extra_shape)
 
-        def neigh_d_norm((arg_x, arg_y, arg_c)):
+        def neigh_d_norm(args):
+            arg_x, arg_y, arg_c = args
             return arg_x * arg_y * (-2 * alpha * beta) / T.power(
                 (T.sqr(arg_x) + T.sqr(arg_y)) * alpha + arg_c, beta + 1)
 
@@ -771,9 +768,6 @@ class TheanoInterval(Interval):
                 c_low = c_with_sq_y.lower - sq_y.lower * alpha
                 c_upp = c_with_sq_y.upper - sq_y.upper * alpha
                 c = TheanoInterval(c_low, c_upp)
-                y_impact = TheanoInterval.from_shape(input_shape,
-                                                     lower_val=numpy.inf,
-                                                     upper_val=-numpy.inf)
                 corners = [(x.lower, y.lower, c.lower),
                            (x.lower, y.lower, c.upper),
                            (x.lower, y.upper, c.lower),
@@ -783,12 +777,6 @@ class TheanoInterval(Interval):
                            (x.upper, y.upper, c.lower),
                            (x.upper, y.upper, c.upper)]
 
-                for corner in corners:
-                    y_impact.lower = T.minimum(y_impact.lower,
-                                               neigh_d_norm(corner))
-                    y_impact.upper = T.maximum(y_impact.upper,
-                                               neigh_d_norm(corner))
-
                 # x^2 * alpha * (2 * beta + 1) - y^2 * alpha - c = 0
 
                 def surf_x_func1(y_arg, c_arg):
@@ -952,6 +940,7 @@ class TheanoInterval(Interval):
                     ((-y.upper, y.upper, -line_c_from_y_upp), xc_cnd)
                 ]
 
+                neigh_extrema = []
                 for m_extr, cond in neigh_maybe_extrema:
                     if cond == x_cnd:
                         cond = T.and_(T.neg(T.isnan(m_extr[0])),
@@ -974,14 +963,10 @@ class TheanoInterval(Interval):
                         cond = T.and_(T.and_(T.neg(T.isnan(m_extr[1])),
                                              in_range(y, m_extr[1])),
                                       in_range(c, m_extr[2]))
-                    y_impact.lower = \
-                        T.switch(cond, T.minimum(y_impact.lower,
-                                                 neigh_d_norm(m_extr)),
-                                 y_impact.lower)
-                    y_impact.upper = \
-                        T.switch(cond, T.maximum(y_impact.upper,
-                                                 neigh_d_norm(m_extr)),
-                                 y_impact.upper)
+                    neigh_extrema.append((neigh_d_norm(m_extr), cond))
+                y_impact = TheanoInterval(*_min_max(
+                    [neigh_d_norm(corner) for corner in corners],
+                    neigh_extrema))
                 y_impact = mid_impact * output
                 T.inc_subtensor(neigh_impact.lower[:, i:i + n_channels, :, :],
                                 y_impact.lower)
@@ -1176,3 +1161,24 @@ class TheanoInterval(Interval):
         lower = T.concatenate([self.lower, other.lower], axis=axis)
         upper = T.concatenate([self.upper, other.upper], axis=axis)
         return TheanoInterval(lower, upper)
+
+
+def _min_max(values, candidates=()):
+    """Returns elementwise minimum and maximum of values.
+
+    All values are stacked once and reduced along the new axis, so the graph
+    has a single reduction node per bound instead of a chain of pairwise
+    minimum and maximum nodes.
+
+    :param values: theano tensors of the same shape
+    :param candidates: pairs (value, condition), where value is taken into
+                       account only where condition holds
+    :type values: list of theano tensors
+    :type candidates: list of pairs of theano tensors
+    :rtype: pair of theano tensors
+    """
+    lower = T.stack(list(values) + [T.switch(cond, value, numpy.inf)
+                                    for value, cond in candidates])
+    upper = T.stack(list(values) + [T.switch(cond, value, -numpy.inf)
+                                    for value, cond in candidates])
+    return lower.min(axis=0), upper.max(axis=0)
@@ -9,7 +9,7 @@
 import numpy as np
 
 from athenet.layers import FullyConnectedLayer
-from athenet.algorithm.utils import list_of_percentage_rows, delete_row
+from athenet.algorithm.utils import percentage_of_rows, select_smallest
 from athenet.algorithm.deleting import delete_weights_by_global_fraction
 
 
@@ -40,35 +40,31 @@ def simple_neuron_indicators(layers, p, layer_limit):
         assert(isinstance(layer, FullyConnectedLayer))
 
     # counter of neurons
-    neurons_for_layer = np.zeros((len(layers),))
-    neurons_in_general = 0
-    # counter of deleted neurons
-    deleted_for_layer = np.zeros((len(layers),))
-    deleted_in_general = 0
+    neurons_for_layer = np.zeros((len(layers),), dtype=int)
 
     # results
     results = []
 
-    # list of all neurons (interpreted as rows of matrices)
-    considered_neurons = []
+    # all neurons (interpreted as rows of matrices) as parallel arrays of
+    # values, numbers of rows and layer ids
+    values = []
     for i in xrange(len(layers)):
         layer = layers[i]
-        considered_neurons += list_of_percentage_rows(i, layer)
+        values.append(percentage_of_rows(layer.W))
         neurons_for_layer[i] = layer.W.shape[0]
-        neurons_in_general += neurons_for_layer[i]
         results.append(-np.ones_like(layer.W))
-
-    considered_neurons = sorted(considered_neurons)
-
-    for val, row, layer_id in considered_neurons:
-        if deleted_in_general >= p * neurons_in_general:
-            break
-        if 1 + deleted_for_layer[layer_id] > \
-                layer_limit * neurons_for_layer[i]:
-            continue
-        deleted_for_layer[layer_id] += 1
-        results[layer_id][row] = val
-        deleted_in_general += 1
+    if not layers:
+        return results
+    values = np.concatenate(values)
+    rows = np.concatenate([np.arange(n) for n in neurons_for_layer])
+    layer_ids = np.repeat(np.arange(len(layers)), neurons_for_layer)
+
+    deleted = select_smallest(values, layer_ids,
+                              layer_limit * neurons_for_layer,
+                              p * np.sum(neurons_for_layer),
+                              ties=(rows, layer_ids))
+    for at in deleted:
+        results[layer_ids[at]][rows[at]] = values[at]
 
     return results
 
@@ -15,8 +15,8 @@
 import numpy as np
 
 from athenet.layers import FullyConnectedLayer, ConvolutionalLayer, MaxPool
-from athenet.algorithm.utils import list_of_percentage_columns, \
-    list_of_percentage_rows, delete_column, delete_row
+from athenet.algorithm.utils import percentage_of_rows, select_smallest, \
+    delete_column, delete_row
 
 
 def simple_neuron_deleter2(network, p, layer_limit):
@@ -48,48 +48,43 @@ def simple_neuron_deleter2(network, p, layer_limit):
     # counter of neurons
     neurons_for_layer = np.zeros((len(network.layers)))
     neurons_in_general = 0
-    # counter of deleted neurons
-    deleted_for_layer = np.zeros((len(network.layers)))
-    deleted_in_general = 0
 
-    # weights is list of tuples (outgoing values of provious layer (rows),
-    # ingoing values of this layer (columns))
-    # ingoing / outgoing value = (value, number of row / column, layer_id)
+    # layer ids, outgoing values of previous layer (rows) and ingoing values
+    # of this layer (columns) of fully connected layers
+    layer_ids = []
     weights = []
     was_fully_connected_layer = False
     for i in xrange(len(network.layers)):
         layer = network.layers[i]
         if isinstance(layer, FullyConnectedLayer):
             was_fully_connected_layer = True
-            weights.append((list_of_percentage_rows(i, layer),
-                            list_of_percentage_columns(i, layer)))
+            layer_ids.append(i)
+            weights.append((percentage_of_rows(layer.W),
+                            percentage_of_rows(np.transpose(layer.W))))
             neurons_for_layer[i] = layer.W.shape[1]
             neurons_in_general += neurons_for_layer[i]
         elif was_fully_connected_layer:
             assert not isinstance(layer, ConvolutionalLayer)
             assert not isinstance(layer, MaxPool)
+    if len(weights) < 2:
+        return
 
-    considered_neurons = []
+    # considered neurons as parallel arrays of values, numbers of column
+    # (and row), column layer ids and row layer ids
+    values = []
     for i in xrange(len(weights) - 1):
-        for j in xrange(len(weights[i][1])):
-            # neuron is reprezented as tuple
-            #(value, number of column (and row), column_layer_id, row_layer_id)
-            assert weights[i][1][j][1] == weights[i + 1][0][j][1]
-            considered_neurons.append(
-                (weights[i][1][j][0] * weights[i + 1][0][j][0],
-                 weights[i][1][j][1],
-                 weights[i][1][j][2],
-                 weights[i + 1][0][j][2])
-            )
+        assert weights[i][1].shape == weights[i + 1][0].shape
+        values.append(weights[i][1] * weights[i + 1][0])
+    neurons = [len(v) for v in values]
+    values = np.concatenate(values)
+    neuron_ids = np.concatenate([np.arange(n) for n in neurons])
+    column_layer_ids = np.repeat(layer_ids[:-1], neurons)
+    row_layer_ids = np.repeat(layer_ids[1:], neurons)
 
-    considered_neurons = sorted(considered_neurons)
-    for val, neuron_id, column_layer_id, row_layer_id in considered_neurons:
-        if deleted_in_general >= p * neurons_in_general:
-            break
-        if deleted_for_layer[column_layer_id] + 1 > \
-                layer_limit * neurons_for_layer[column_layer_id]:
-            continue
-        delete_column(network.layers[column_layer_id], neuron_id)
-        delete_row(network.layers[row_layer_id], neuron_id)
-        deleted_for_layer[column_layer_id] += 1
-        deleted_in_general += 1
+    deleted = select_smallest(values, column_layer_ids,
+                              layer_limit * neurons_for_layer,
+                              p * neurons_in_general,
+                              ties=(neuron_ids, column_layer_ids))
+    for at in deleted:
+        delete_column(network.layers[column_layer_ids[at]], neuron_ids[at])
+        delete_row(network.layers[row_layer_ids[at]], neuron_ids[at])
@@ -1,6 +1,16 @@
 import numpy as np
 
 
+def percentage_of_rows(table):
+    """returns array of "percentages" of rows of [table]
+
+       "percentage" is a sum of absolute values in row divided by
+       sum of absolute values in all table
+    """
+    abs_table = abs(table).reshape((table.shape[0], -1))
+    return np.sum(abs_table, axis=1) / np.sum(abs_table)
+
+
 def list_of_percentage_rows_table(table, layer_id):
     """returns list of tuples (percentage, number of row, [layer_id])
        representing rows of [table]
@@ -10,11 +20,8 @@ def list_of_percentage_rows_table(table, layer_id):
 
        result list is sorted by "number of row"
     """
-    sum_of_all = np.sum(abs(table))
-    result = []
-    for i in xrange(table.shape[0]):
-        result.append((np.sum(abs(table[i])) / sum_of_all, i, layer_id))
-    return result
+    return [(percentage, i, layer_id)
+            for i, percentage in enumerate(percentage_of_rows(table))]
 
 
 def list_of_percentage_columns(layer_id, layer):
@@ -25,6 +32,31 @@ def list_of_percentage_rows(layer_id, layer):
     return list_of_percentage_rows_table(layer.W, layer_id)
 
 
+def select_smallest(values, groups, group_limits, limit, ties=()):
+    """returns indices of [values] chosen greedily in increasing order
+
+       values are considered in increasing order, ties are resolved by
+       arrays in [ties] in turn. Value is skipped if more than
+       [group_limits][g] values would be chosen from its group g given in
+       [groups]. Choosing stops once [limit] values are chosen.
+
+       result is sorted in order of choosing
+    """
+    order = np.lexsort(tuple(reversed(ties)) + (values,))
+    sorted_groups = groups[order]
+    # position of every value among values of its group, in sorted order
+    by_group = np.argsort(sorted_groups, kind='mergesort')
+    group_sizes = np.bincount(sorted_groups)
+    group_starts = np.cumsum(group_sizes) - group_sizes
+    rank = np.empty_like(by_group)
+    rank[by_group] = np.arange(len(order)) - \
+        np.repeat(group_starts, group_sizes)
+    allowed = rank + 1 <= np.asarray(group_limits)[sorted_groups]
+    # values chosen before given one are allowed values before it
+    chosen = np.logical_and(allowed, np.cumsum(allowed) - 1 < limit)
+    return order[chosen]
+
+
 def delete_column(layer, i):
     W = layer.W
     W[:, i] = 0.
@@ -2,8 +2,10 @@
 
 import os
 import numpy as np
-from scipy import misc
-from collections import OrderedDict
+from numpy.lib.format import open_memmap
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+from PIL import Image
 
 import theano
 
@@ -40,55 +42,70 @@ class ImageNetDataLoader(DataLoader):
         self.buffer_size = buffer_size
         self.shuffle_train_data = True
         self._height, self._width = image_shape
+        self._mean = np.asarray(self.mean_rgb, dtype=theano.config.floatX)
+        self._mean = self._mean.reshape((3, 1, 1))
+        self._pool = ThreadPool(cpu_count())
+        # next buffer of every data set is loaded in the background while
+        # the current one is used
+        self._prefetcher = ThreadPool(1)
+        self._prefetched = {}
+        # decoded images of data sets, see build_cache
+        self._caches = {}
+        # batches of every data set are loaded alternately into two reused
+        # arrays, one is used while the other one is being prefetched
+        self._stages = {}
 
         base_name = self.name_prefix + str(year)
         self.train_name = base_name + self.train_suffix
         self.val_name = base_name + self.val_suffix
 
         if train_data:
-            index = 0
-            answers = []
+            n_copies = 2 if reverse_training else 1
             train_files = []
+            counts = []
             train_dirs = os.listdir(get_bin_path(self.train_name))
             for d in train_dirs:
                 path = os.path.join(self.train_name, d)
-                files = os.listdir(get_bin_path(path))
-                train_files += [(os.path.join(d, f), False) for f in files]
-                answers += [index for i in range(len(files))]
-                if reverse_training:
-                    train_files += [(os.path.join(d, f), True) for f in files]
-                    answers += [index for i in range(len(files))]
-                index += 1
+                files = [os.path.join(d, f)
+                         for f in os.listdir(get_bin_path(path))]
+                # reversed copies follow originals in every directory
+                train_files += files * n_copies
+                counts.append(len(files))
+            # file names and flags whether to reverse images are kept in
+            # separate arrays, in one array flags would become strings
             self.train_files = np.asarray(train_files)
-            self.train_answers = np.asarray(answers)
+            self.train_reverse = np.repeat(
+                np.tile([False, True][:n_copies], len(train_dirs)),
+                np.repeat(counts, n_copies))
+            self.train_answers = np.repeat(np.arange(len(train_dirs)),
+                                           np.multiply(counts, n_copies))
 
             self._train_in = Buffer(self)
             self._train_out = theano.shared(self.train_answers, borrow=True)
             self.train_data_available = True
-            self.train_set_size = len(answers)
+            self.train_set_size = len(self.train_answers)
 
         if val_data:
-            answers = OrderedDict()
             with open(get_data_path(self.val_name + '.txt'), 'rb') as f:
-                while True:
-                    line = f.readline()
-                    if not line:
-                        break
-                    filename, answer = line.rsplit(' ', 1)
-                    answers[filename] = np.array(int(answer), dtype="int32")
-            val_files = [(filename, False) for filename in answers.keys()]
-            val_answers = answers.values()
+                lines = f.read().splitlines()
+            filenames, answers = zip(*[line.rsplit(' ', 1) for line in lines])
+            val_files = list(filenames)
+            val_reverse = [False] * len(filenames)
+            val_answers = [int(answer) for answer in answers]
             if reverse_validation:
-                val_files = [(filename, True) for filename in answers.keys()]
+                val_files *= 2
+                val_reverse += [True] * len(filenames)
                 val_answers *= 2
-            val_answers = np.asarray(val_answers)
+            val_answers = np.asarray(val_answers, dtype='int32')
             self.val_files = np.asarray(val_files)
+            self.val_reverse = np.asarray(val_reverse)
             self.val_set_size = len(self.val_files)
 
             # Reduce amount of validation data, if necessary
             if val_size and val_size < self.val_set_size:
                 ind = np.random.permutation(self.val_set_size)[:val_size]
                 self.val_files = self.val_files[ind]
+                self.val_reverse = self.val_reverse[ind]
                 val_answers = val_answers[ind]
                 self.val_set_size = val_size
 
@@ -99,33 +116,140 @@ class ImageNetDataLoader(DataLoader):
         self.batch_size = 1
 
     def _get_img(self, filename, reverse):
-        img = misc.imread(get_bin_path(filename))
-        img = np.rollaxis(img, 2)
-        img = img.reshape((1, 3, self._height, self._width))
-        result = np.asarray(img, dtype=theano.config.floatX)
+        img = Image.open(get_bin_path(filename)).convert('RGB')
+        img = np.rollaxis(np.asarray(img), 2)
         if reverse:
-            return result[..., ::-1]
-        return result
-
-    def _load_imgs(self, dir_name, files):
-        imgs = []
-        for filename, reverse in files:
-            img = self._get_img(os.path.join(dir_name, filename), reverse)
-            r, g, b = np.split(img, 3, axis=1)
-            r -= self.mean_rgb[0]
-            g -= self.mean_rgb[1]
-            b -= self.mean_rgb[2]
-            img = np.concatenate([r, g, b], axis=1)
-            imgs += [img]
-        return np.asarray(np.concatenate(imgs, axis=0),
-                          dtype=theano.config.floatX)
+            return img[..., ::-1]
+        return img
+
+    def _cache_paths(self, dir_name):
+        name = '%s_%dx%d' % (dir_name, self._height, self._width)
+        return get_bin_path(name + '.npy'), get_bin_path(name + '_files.npy')
+
+    def _get_cache(self, dir_name):
+        if dir_name not in self._caches:
+            imgs_path, files_path = self._cache_paths(dir_name)
+            # list of files is written last, so the cache is complete
+            if os.path.exists(files_path):
+                self._caches[dir_name] = (np.load(imgs_path, mmap_mode='r'),
+                                          np.load(files_path))
+            else:
+                self._caches[dir_name] = None
+        return self._caches[dir_name]
+
+    def build_cache(self):
+        """Decode images of available data sets once and store them on disk.
+
+        Images are stored in their original orientation as uint8 in
+        memory-mapped files next to data sets. They are read instead of
+        decoding images by every data loader with the same image shape,
+        also in following runs.
+        """
+        data_sets = []
+        if self.train_data_available:
+            data_sets.append((self.train_name, self.train_files))
+        if self.val_data_available:
+            data_sets.append((self.val_name, self.val_files))
+
+        for dir_name, files in data_sets:
+            files = np.unique(files)
+            imgs_path, files_path = self._cache_paths(dir_name)
+            # old cache must not be used while images are being rewritten
+            if os.path.exists(files_path):
+                os.remove(files_path)
+            self._caches.pop(dir_name, None)
+            imgs = open_memmap(imgs_path, mode='w+', dtype=np.uint8,
+                               shape=(len(files), 3, self._height,
+                                      self._width))
+
+            def cache_img(args):
+                img, filename = args
+                img[...] = self._get_img(os.path.join(dir_name, filename),
+                                         False)
+
+            self._pool.map(cache_img, zip(imgs, files))
+            imgs.flush()
+            del imgs
+            np.save(files_path, files)
+            # loads during rebuild may have found no cache
+            self._caches.pop(dir_name, None)
+
+    def _get_stage(self, dir_name, batch_index, n_imgs):
+        key = (dir_name, batch_index / self.buffer_size % 2)
+        stage = self._stages.get(key)
+        if stage is None or len(stage) < n_imgs:
+            stage = np.empty((n_imgs, 3, self._height, self._width),
+                             dtype=theano.config.floatX)
+            self._stages[key] = stage
+        return stage[:n_imgs]
+
+    def _load_imgs(self, dir_name, files, reverse, imgs):
+        # images stay uint8 until they are centered straight into the batch,
+        # casting and subtracting mean in one pass
+
+        cache = self._get_cache(dir_name)
+        if cache is not None and len(cache[1]):
+            cached_imgs, cached_files = cache
+            rows = np.minimum(np.searchsorted(cached_files, files),
+                              len(cached_files) - 1)
+            # cache may lack files, e.g. of other validation subset
+            if (cached_files[rows] == files).all():
+                np.subtract(cached_imgs[rows], self._mean, out=imgs)
+                imgs[reverse] = imgs[reverse][..., ::-1]
+                return imgs
+
+        def load_img(args):
+            img, filename, reverse_img = args
+            np.subtract(self._get_img(os.path.join(dir_name, filename),
+                                      reverse_img),
+                        self._mean, out=img)
+
+        # Pillow releases the GIL while decoding
+        self._pool.map(load_img, zip(imgs, files, reverse))
+        return imgs
+
+    def _get_imgs(self, dir_name, all_files, all_reverse, batch_index):
+        """Return images of the buffer starting at batch_index and start
+        loading the next buffer in the background.
+
+        :param dir_name: Directory of the data set.
+        :param all_files: Files of the data set, in order of minibatches.
+        :param all_reverse: Whether to reverse respective images.
+        :param batch_index: Index of the first minibatch in the buffer.
+        :return: Images in format (number of images, 3, height, width).
+        """
+        prefetched_index, prefetched = self._prefetched.pop(dir_name,
+                                                            (None, None))
+        if prefetched_index == batch_index:
+            imgs = prefetched.get()
+        else:
+            # unused prefetch must not write into array being loaded
+            if prefetched is not None:
+                prefetched.wait()
+            files = self._get_subset(all_files, batch_index, self.buffer_size)
+            reverse = self._get_subset(all_reverse, batch_index,
+                                       self.buffer_size)
+            imgs = self._load_imgs(
+                dir_name, files, reverse,
+                self._get_stage(dir_name, batch_index, len(files)))
+
+        next_index = batch_index + self.buffer_size
+        files = self._get_subset(all_files, next_index, self.buffer_size)
+        reverse = self._get_subset(all_reverse, next_index, self.buffer_size)
+        if len(files):
+            stage = self._get_stage(dir_name, next_index, len(files))
+            self._prefetched[dir_name] = (
+                next_index,
+                self._prefetcher.apply_async(
+                    self._load_imgs, (dir_name, files, reverse, stage)))
+        return imgs
 
     def load_val_data(self, batch_index):
         if self._val_in.contains(batch_index):
             return
 
-        files = self._get_subset(self.val_files, batch_index, self.buffer_size)
-        imgs = self._load_imgs(self.val_name, files)
+        imgs = self._get_imgs(self.val_name, self.val_files, self.val_reverse,
+                              batch_index)
         self._set_subset(self._val_in, imgs, batch_index, self.buffer_size)
 
     def val_input(self, batch_index):
@@ -142,12 +266,12 @@ class ImageNetDataLoader(DataLoader):
         if batch_index == 0 and self.shuffle_train_data:
             ind = np.random.permutation(self.train_set_size)
             self.train_files = self.train_files[ind]
+            self.train_reverse = self.train_reverse[ind]
             self.train_answers = self.train_answers[ind]
             self._train_out.set_value(self.train_answers, borrow=True)
 
-        files = self._get_subset(self.train_files, batch_index,
-                                 self.buffer_size)
-        imgs = self._load_imgs(self.train_name, files)
+        imgs = self._get_imgs(self.train_name, self.train_files,
+                              self.train_reverse, batch_index)
         self._set_subset(self._train_in, imgs, batch_index, self.buffer_size)
 
     def train_input(self, batch_index):
@@ -156,6 +280,18 @@ class ImageNetDataLoader(DataLoader):
     def train_output(self, batch_index):
         return self._get_subset(self._train_out, batch_index)
 
+    def close(self):
+        """Wait for images being prefetched and stop threads of the loader.
+
+        Data loader cannot load images after it is closed.
+        """
+        for _, prefetched in self._prefetched.values():
+            prefetched.wait()
+        self._prefetched = {}
+        for pool in (self._prefetcher, self._pool):
+            pool.close()
+            pool.join()
+
 
 class AlexNetImageNetDataLoader(ImageNetDataLoader):
     """ImageNet data loader for AlexNet."""
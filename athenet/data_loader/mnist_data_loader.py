@@ -45,7 +45,7 @@ class MNISTDataLoader(DataLoader):
         :return: Shared variables created from data.
         """
         data_in, data_out = data
-        data_in = np.resize(data_in, (data_in.shape[0], 1, 28, 28))
+        data_in = data_in.reshape((data_in.shape[0], 1, 28, 28))
         shared_in = theano.shared(
             np.asarray(data_in, dtype=theano.config.floatX), borrow=True)
         shared_out = theano.shared(
@@ -210,6 +210,31 @@ class TestMultiplying(TestNpInterval):
                 b_random = self._random_ndarray_from_interval(b)
                 self._assert_in_interval(a_random * b_random, a * b)
 
+    def test_operands_unchanged(self):
+        a = NpInterval(np.array([-1., 2.]), np.array([3., 4.]))
+        b = NpInterval(np.array([-2., -1.]), np.array([1., 5.]))
+        result = a * b
+        self.assertTrue((result.lower == np.array([-6., -4.])).all())
+        self.assertTrue((result.upper == np.array([3., 20.])).all())
+        self.assertTrue((a.lower == np.array([-1., 2.])).all())
+        self.assertTrue((b.upper == np.array([1., 5.])).all())
+
+    def test_non_negative(self):
+        a = NpInterval(np.array([0., 1.]), np.array([2., 3.]))
+        b = NpInterval(np.array([4., 0.5]), np.array([5., 6.]))
+        result = a * b
+        self.assertTrue((result.lower == np.array([0., 0.5])).all())
+        self.assertTrue((result.upper == np.array([10., 18.])).all())
+
+    def test_0d(self):
+        a = NpInterval(np.array(-1.), np.array(2.))
+        result = a * a
+        self.assertEqual(result.lower, -2.)
+        self.assertEqual(result.upper, 4.)
+        result = a * -3.
+        self.assertEqual(result.lower, -6.)
+        self.assertEqual(result.upper, 3.)
+
 
 class TestAdding(TestNpInterval):
     def test_case(self):
@@ -265,6 +290,18 @@ class TestAdding(TestNpInterval):
             R = A + B
             self.assertEqual(R.shape, shape)
 
+    def test_broadcast(self):
+        a = self._random_npinterval(shape=(3, 1))
+        b = self._random_npinterval(shape=(1, 4))
+        c = self._random_ndarray(shape=(4, ))
+        r = a + b
+        self.assertEqual(r.shape, (3, 4))
+        self.assertTrue((r.lower == a.lower + b.lower).all())
+        self.assertTrue((r.upper == a.upper + b.upper).all())
+        r = a + c
+        self.assertTrue((r.lower == a.lower + c).all())
+        self.assertTrue((r.upper == a.upper + c).all())
+
     def test_random_example(self):
         for _ in xrange(20):
             shape = self._random_shape()
@@ -275,6 +312,28 @@ class TestAdding(TestNpInterval):
                 b_random = self._random_ndarray_from_interval(b)
                 self._assert_in_interval(a_random + b_random, a + b)
 
+    def test_in_place(self):
+        shape = self._random_shape()
+        a = self._random_npinterval(shape=shape)
+        b = self._random_npinterval(shape=shape)
+        expected = a + b
+        lower = a.lower
+        a += b
+        self.assertIs(a.lower, lower)
+        self._assert_npintervals_equal(a, expected)
+        a += 2.
+        self._assert_npintervals_equal(a, expected + 2.)
+
+    def test_in_place_read_only(self):
+        a = NpInterval.from_shape((3, 4), lower_val=1., upper_val=2.,
+                                  read_only=True)
+        b = a
+        b += a
+        self._assert_npintervals_equal(a, NpInterval.from_shape(
+            (3, 4), lower_val=1., upper_val=2.))
+        self._assert_npintervals_equal(b, NpInterval.from_shape(
+            (3, 4), lower_val=2., upper_val=4.))
+
 
 class TestSub(TestNpInterval):
     def test_case(self):
@@ -333,6 +392,22 @@ class TestSub(TestNpInterval):
                 b_random = self._random_ndarray_from_interval(b)
                 self._assert_in_interval(a_random - b_random, a - b)
 
+    def test_in_place(self):
+        shape = self._random_shape()
+        a = self._random_npinterval(shape=shape)
+        b = self._random_npinterval(shape=shape)
+        expected = a - b
+        upper = a.upper
+        a -= b
+        self.assertIs(a.upper, upper)
+        self._assert_npintervals_equal(a, expected)
+
+    def test_in_place_self(self):
+        a = self._random_npinterval()
+        expected = a - a
+        a -= a
+        self._assert_npintervals_equal(a, expected)
+
 
 class TestSquare(TestNpInterval):
     def test_case(self):
@@ -419,6 +494,34 @@ class TestGetSetitem(TestNpInterval):
             self.assertEquals(I[i][j][k][l].lower, i*l ^ j*k)
             self.assertEquals(I[i][j][k][l].upper, (i*j ^ l*k) + 1000)
 
+    def test_tuple(self):
+        a = self._random_npinterval(shape=(3, 4, 5, 6))
+        at = (1, slice(None), 2, slice(1, 4))
+        result = a[at]
+        self.assertEqual(result.shape, (4, 3))
+        self.assertTrue((result.lower == a.lower[at]).all())
+        self.assertTrue((result.upper == a.upper[at]).all())
+        self._assert_npintervals_equal(result, a[1][:, 2][:, 1:4])
+
+
+class TestAstype(TestNpInterval):
+    def test_case(self):
+        a = self._random_npinterval(shape=(3, 4))
+        b = a.astype(np.float32)
+        self.assertEqual(b.lower.dtype, np.float32)
+        self.assertEqual(b.upper.dtype, np.float32)
+        self._check_lower_upper(b)
+        assert_array_almost_equal(b.lower, a.lower, decimal=4)
+        assert_array_almost_equal(b.upper, a.upper, decimal=4)
+        self.assertEqual(a.lower.dtype, np.float64)
+
+    def test_copy(self):
+        a = self._random_npinterval(shape=(3, 4))
+        self.assertTrue(a.astype(np.float64, copy=False) is a)
+        b = a.astype(np.float64)
+        b.lower[0, 0] = -10 ** 3
+        self.assertNotEqual(a.lower[0, 0], -10 ** 3)
+
 
 class TestAntiadd(TestCase):
     def test_case(self):
@@ -465,6 +568,45 @@ class TestAntiadd(TestCase):
             self.assertEqual(R.shape, shape)
 
 
+class TestNorm(TestCase):
+
+    def _count_norm(self, x, k, alpha, beta, local_range):
+        res = np.zeros_like(x)
+        ch, h, w = x.shape
+        half = local_range / 2
+        for at_ch, at_h, at_w in product(xrange(ch), xrange(h), xrange(w)):
+            s = 0.
+            for i in xrange(at_ch - half, at_ch - half + local_range):
+                if 0 <= i < ch:
+                    s += x[i, at_h, at_w] ** 2
+            res[at_ch, at_h, at_w] = x[at_ch, at_h, at_w] / \
+                (k + alpha / local_range * s) ** beta
+        return res
+
+    def test_points(self):
+        for local_range in xrange(1, 7):
+            shape = (randrange(1, 8), randrange(1, 4), randrange(1, 4))
+            x = np.random.rand(*shape) * 20 - 10
+            k, a, b = uniform(1, 3), uniform(0.1, 1), uniform(0.5, 1)
+            R = NpInterval(x, 1 * x).op_norm(shape, local_range, k, a, b)
+            res = self._count_norm(x, k, a, b, local_range)
+            assert_array_almost_equal(R.lower, res)
+            assert_array_almost_equal(R.upper, res)
+
+    def test_even_local_range(self):
+        for i in xrange(20):
+            local_range = randrange(1, 4) * 2
+            shape = (randrange(1, 8), randrange(1, 4), randrange(1, 4))
+            I = _random_npinterval(shape)
+            k, a, b = uniform(1, 3), uniform(0.1, 1), uniform(0.5, 1)
+            R = I.op_norm(shape, local_range, k, a, b)
+            for j in xrange(10):
+                x = _rand_from_npinterval(I)
+                res = self._count_norm(x, k, a, b, local_range)
+                self.assertTrue((R.lower <= res + 1e-6).all())
+                self.assertTrue((res <= R.upper + 1e-6).all())
+
+
 class TestDNorm(TestCase):
 
     def der_eq(self, x, c, a, b):
@@ -702,6 +844,28 @@ class TestDNorm(TestCase):
             R = D.op_d_norm(A, shape, local_range, k, a, b)
             self.assertEquals(A.shape, R.shape)
 
+    def test_batch_independent(self):
+        for _ in xrange(20):
+            shape = (randrange(2, 5), randrange(1, 8), randrange(1, 5),
+                     randrange(1, 5))
+            local_range = randrange(0, 3) * 2 + 1
+            k = uniform(0.1, 10)
+            a = uniform(0.1, 10)
+            b = uniform(0.75, 3)
+            A = _random_npinterval(shape)
+            D = _random_npinterval(shape)
+            R = D.op_d_norm(A, shape, local_range, k, a, b)
+            for at_b, at_h, at_w in product(xrange(shape[0]),
+                                            xrange(shape[2]),
+                                            xrange(shape[3])):
+                at = (slice(at_b, at_b + 1), slice(None),
+                      slice(at_h, at_h + 1), slice(at_w, at_w + 1))
+                single_shape = (1, shape[1], 1, 1)
+                R_single = D[at].op_d_norm(A[at], single_shape, local_range,
+                                           k, a, b)
+                self.assertTrue(np.isclose(R[at].lower, R_single.lower).all())
+                self.assertTrue(np.isclose(R[at].upper, R_single.upper).all())
+
 
 class ReluDerivativeTest(TestCase):
 
@@ -1274,6 +1438,14 @@ class TestPower(TestNpInterval):
         a = NpInterval(np.array([-5]), np.array([-1]))
         a.pow(0.5)
 
+    def test_pow_to_two(self):
+        a = NpInterval(np.array([-1., 0., 3., -4.]),
+                       np.array([2., 1., 4., -2.]))
+        expected_result = NpInterval(np.array([0., 0., 9., 4.]),
+                                     np.array([4., 1., 16., 16.]))
+        self._assert_npintervals_equal(a.power(2), expected_result)
+        self._assert_npintervals_equal(a.power(2.), expected_result)
+
     def test_random_example(self):
         for _ in xrange(20):
             a = self._random_npinterval(shape=(1, ))
@@ -1314,6 +1486,30 @@ class TestDot(TestNpInterval):
                 a_random = self._random_ndarray_from_interval(a)
                 self._assert_in_interval(a_random.dot(b), a.dot(b))
 
+    def test_dot_npinterval(self):
+        a = NpInterval(np.array([[-1, 2]]), np.array([[3, 4]]))
+        b = NpInterval(np.array([[1], [-2]]), np.array([[2], [1]]))
+        expected_result = NpInterval(np.array([[-10]]), np.array([[10]]))
+        self._assert_npintervals_equal(a.dot(b), expected_result)
+
+    def test_dot_npinterval_check_random_example(self):
+        for _ in xrange(20):
+            a = self._random_npinterval(shape=(8, 12))
+            b = self._random_npinterval(shape=(12, 8))
+            b_non_negative = NpInterval(np.abs(b.lower), np.abs(b.lower) +
+                                        b.upper - b.lower)
+            for other in [b, b_non_negative]:
+                result = a.dot(other)
+                reversed_result = other.T.dot(a.T)
+                self._check_lower_upper(result)
+                self._check_lower_upper(reversed_result)
+                for _ in xrange(20):
+                    a_random = self._random_ndarray_from_interval(a)
+                    o_random = self._random_ndarray_from_interval(other)
+                    self._assert_in_interval(a_random.dot(o_random), result)
+                    self._assert_in_interval(o_random.T.dot(a_random.T),
+                                             reversed_result)
+
 
 class TestMax(TestNpInterval):
     def test_max(self):
@@ -1381,6 +1577,35 @@ class TestSmallFunctions(TestNpInterval):
                                      np.array([-5, 3, 0, 12]))
         self._assert_npintervals_equal(a.neg(), expected_result)
 
+    def test_single_element(self):
+        a = NpInterval(np.array([-2., 1.]), np.array([3., 4.]))[0]
+        self.assertEqual((a.neg().lower, a.neg().upper), (-3., 2.))
+        self.assertEqual((a.abs().lower, a.abs().upper), (0., 3.))
+        self.assertEqual((a.square().lower, a.square().upper), (0., 9.))
+        self.assertEqual(((a + a).lower, (a + a).upper), (-4., 6.))
+        self.assertEqual((a.op_relu().lower, a.op_relu().upper), (0., 3.))
+
+    def test_concatenate(self):
+        a = self._random_npinterval(shape=(2, 3, 4))
+        b = self._random_npinterval(shape=(2, 5, 4))
+        for axis in [1, -2]:
+            result = NpInterval.concatenate([a, b], axis=axis)
+            self.assertTrue((result.lower == np.concatenate(
+                [a.lower, b.lower], axis=axis)).all())
+            self.assertTrue((result.upper == np.concatenate(
+                [a.upper, b.upper], axis=axis)).all())
+            self._assert_npintervals_equal(result, a.concat(b, axis=axis))
+
+    def test_stack(self):
+        a = self._random_npinterval(shape=(2, 3))
+        b = self._random_npinterval(shape=(2, 3))
+        for axis in [0, 2, -1]:
+            result = NpInterval.stack([a, b, a], axis=axis)
+            self.assertTrue((result.lower == np.stack(
+                [a.lower, b.lower, a.lower], axis=axis)).all())
+            self.assertTrue((result.upper == np.stack(
+                [a.upper, b.upper, a.upper], axis=axis)).all())
+
     def test_reshape(self):
         a = self._random_npinterval(shape=(4, 5, 6))
         result = a.reshape((2, 6, 5, 2, 1))
@@ -1397,6 +1622,13 @@ class TestSmallFunctions(TestNpInterval):
         expexted_result = NpInterval(np.array([1, 0, 0]), np.array([3, 3, 2]))
         self._assert_npintervals_equal(a.abs(), expexted_result)
 
+    def test_abs_all_signs(self):
+        a = NpInterval(np.array([2., -5., -1., 0.]),
+                       np.array([5., -2., 3., 0.]))
+        expected_result = NpInterval(np.array([2., 2., 0., 0.]),
+                                     np.array([5., 5., 3., 0.]))
+        self._assert_npintervals_equal(a.abs(), expected_result)
+
     def test_T_random(self):
         a = self._random_npinterval(shape=(8, 5))
         self.assertTrue(a.T.shape == (5, 8))
@@ -1423,6 +1655,34 @@ class TestSmallFunctions(TestNpInterval):
             self.assertTrue(
                 np.logical_or(output.upper == 0., output.upper == 1.).all())
 
+    def test_patches(self):
+        a = self._random_npinterval(shape=(3, 9, 8))
+        for patch_shape, stride in product([(1, 1), (2, 3), (3, 3)],
+                                           [(1, 1), (2, 1), (2, 3)]):
+            ph, pw = patch_shape
+            sh, sw = stride
+            result = a.patches(patch_shape, stride)
+            for i, (i2, i3) in enumerate(product(xrange(ph), xrange(pw))):
+                expected_result = a[:, i2:(9 - ph + i2 + 1):sh,
+                                    i3:(8 - pw + i3 + 1):sw]
+                self.assertEqual(result[:, i].shape, expected_result.shape)
+                self._assert_npintervals_equal(result[:, i], expected_result)
+
+    def test_from_shape_read_only(self):
+        shape = (3, 4, 5)
+        a = NpInterval.from_shape(shape, neutral=False)
+        b = NpInterval.from_shape(shape, neutral=False, read_only=True)
+        self.assertTrue(b.shape == shape)
+        self._assert_npintervals_equal(a, b)
+        self.assertTrue(b.lower.dtype == a.lower.dtype)
+        self.assertFalse(b.lower.flags.writeable)
+        self.assertFalse(b.upper.flags.writeable)
+
+    def test_broadcast_bounds_checked(self):
+        with self.assertRaises(AssertionError):
+            NpInterval(np.broadcast_to(np.float32(2.), (3, 4)),
+                       np.broadcast_to(np.float32(1.), (3, 4)))
+
 
 if __name__ == '__main__':
     main(verbosity=2)
@@ -161,5 +161,9 @@ class NumlikeTest(unittest.TestCase):
     def test_derest_output(self):
         _ = Numlike.derest_output(3)
 
+    @raises(NotImplementedError)
+    def test_patches(self):
+        _ = Numlike().patches((2, 2), (1, 1))
+
 if __name__ == '__main__':
     unittest.main(verbosity=2, catchbreak=True)
@@ -11,7 +11,8 @@ from athenet.layers import ConvolutionalLayer, FullyConnectedLayer, \
 from athenet.algorithm import simple_neuron_deleter, simple_neuron_deleter2
 from athenet.algorithm.simple_neuron_deleter import simple_neuron_indicators
 from athenet.algorithm.utils import list_of_percentage_rows_table, delete_row,\
-    list_of_percentage_rows, list_of_percentage_columns, delete_column
+    list_of_percentage_rows, list_of_percentage_columns, delete_column, \
+    select_smallest
 
 
 def get_simple_network():
@@ -50,6 +51,15 @@ class TestUtils(TestCase):
             self.assertEqual((i, l_id), (e_i, e_l_id))
             self.assertTrue(abs(val - e_val) < eps)
 
+    def test_select_smallest(self):
+        values = np.asarray([0.5, 0.1, 0.2, 0.1, 0.3, 0.])
+        groups = np.asarray([0, 0, 0, 1, 1, 1])
+        rows = np.asarray([0, 1, 2, 0, 1, 2])
+        chosen = select_smallest(values, groups, [1, 5], 3, ties=(rows, ))
+        self.assertEqual(list(chosen), [5, 3, 1])
+        chosen = select_smallest(values, groups, [2, 1], 5, ties=(rows, ))
+        self.assertEqual(list(chosen), [5, 1, 2])
+
     def test_listing_layers(self):
         net = get_simple_network()
         layer1 = net.weighted_layers[3]